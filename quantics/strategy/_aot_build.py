@@ -0,0 +1,41 @@
+"""
+向量化回测内核的AOT编译脚本
+
+使用numba.pycc将成交模拟、性能指标、融合指标和RSI内核预先编译为扩展模块_hotpath，
+导入时直接加载机器码，没有JIT编译和缓存校验的预热开销，运行时也不再依赖numba。
+未编译时自动使用JIT版本。
+
+注意：预编译的函数调用期间不释放GIL，compare_strategies的线程并发会退化为串行执行。
+
+用法：
+    python -m quantics.strategy._aot_build
+"""
+
+import os
+
+from numba.pycc import CC
+
+from quantics.strategy import indicators, vector_engine
+
+cc = CC('_hotpath')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 导出的函数体与JIT版本相同，只是编译时机不同
+_EXPORTS = [
+    ('simulate_f8', 'Tuple((f8[:], i8[:, :]))(f8[:], f8[:], i1[:], f8, f8, f8)', vector_engine._simulate),
+    ('simulate_f4', 'Tuple((f8[:], i8[:, :]))(f4[:], f4[:], i1[:], f8, f8, f8)', vector_engine._simulate),
+    ('metrics', 'UniTuple(f8, 4)(f8[:], i8[:, :], f8)', vector_engine._metrics),
+    ('compute_all_f8', 'Tuple((f8[:, :], f8[:, :, :], f8[:, :, :]))(f8[:], i8[:], i8[:], f8[:], i8[:, :])',
+     indicators._compute_all),
+    ('compute_all_f4', 'Tuple((f8[:, :], f8[:, :, :], f8[:, :, :]))(f4[:], i8[:], i8[:], f8[:], i8[:, :])',
+     indicators._compute_all),
+    ('rsi_sma', 'f8[:](f8[:], i8)', indicators._rsi_sma),
+]
+
+for name, signature, kernel in _EXPORTS:
+    # JIT内核通过py_func取得原始Python函数
+    cc.export(name, signature)(kernel.py_func)
+
+
+if __name__ == '__main__':
+    cc.compile()
@@ -0,0 +1,46 @@
+"""
+Numba兼容层
+
+numba可用时导出njit；未安装numba时退化为原生Python实现，
+保证依赖这些装饰器的模块仍然可以正常导入和运行。
+存在_aot_build预编译的扩展模块时同时导出hotpath，运行时不依赖numba。
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """支持@njit和@njit(...)两种写法的空装饰器"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+# _aot_build预编译的内核扩展模块，未编译时为None
+try:
+    from quantics.strategy import _hotpath as hotpath
+except ImportError:
+    hotpath = None
+
+
+def jit_signatures(signatures):
+    """
+    导入时需要即时编译的签名
+
+    存在预编译内核时返回None，JIT版本推迟到首次调用时才编译，避免导入时的编译开销
+
+    参数：
+    - signatures: 签名字符串或签名列表
+
+    返回：
+    - 签名或None
+    """
+    return signatures if hotpath is None else None
+
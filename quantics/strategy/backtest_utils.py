@@ -7,12 +7,84 @@
 - 结果分析和可视化
 """
 
+import copy
+import itertools
+import math
+import multiprocessing as mp
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError, as_completed
+
 import backtrader as bt
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import matplotlib.pyplot as plt
 
+from quantics.strategy import indicators, indicators_pl, vector_engine
+from quantics.strategy._njit import NUMBA_AVAILABLE
+from quantics.strategy.base_strategy import BaseStrategy
+from quantics.strategy.indicators import IndicatorCache
+
+
+# 参数优化时每完成多少个参数组合输出一次进度
+_PROGRESS_FLUSH_EVERY = 100
+
+# 向量化参数优化每批回测的参数组合数，限制(k, n)信号和资金曲线数组的内存占用
+_OPTIMIZE_BATCH_SIZE = 256
+
+# 策略比较结果的结构化数组类型，指标缺失时为NaN
+_PERFORMANCE_DTYPE = np.dtype([
+    ('name', 'O'),
+    ('sharpe_ratio', 'f8'),
+    ('max_drawdown', 'f8'),
+    ('annual_return', 'f8'),
+    ('win_rate', 'f8'),
+    ('final_value', 'f8'),
+    ('total_return', 'f8'),
+    ('equity_curve', 'O'),
+])
+
+# 子进程中重建的数据源和回测工具，由_init_worker在每个子进程启动时设置一次
+_worker_data_feed = None
+_worker_backtest_utils = None
+
+
+def _init_worker(feed_class, data_bytes, feed_kwargs, initial_cash, commission):
+    """
+    子进程初始化函数
+    
+    Backtrader数据源对象无法跨进程传递，因此只传递序列化后的DataFrame，
+    在每个子进程中重建一次数据源和回测工具，供该进程后续的所有参数组合复用
+    """
+    global _worker_data_feed, _worker_backtest_utils
+    _worker_data_feed = feed_class(dataname=pickle.loads(data_bytes), **feed_kwargs)
+    _worker_backtest_utils = BacktestUtils(initial_cash=initial_cash, commission=commission)
+
+
+def _run_one(args):
+    """
+    在子进程中运行单个参数组合
+    
+    参数：
+    - args: (strategy_class, params)
+    
+    返回：
+    - tuple: (params, metrics, error)，运行失败时metrics为None
+    """
+    strategy_class, params = args
+    run_params = dict(params)
+    if 'printlog' in strategy_class.params._getkeys():
+        # 关闭子进程中的日志，避免多个进程争用标准输出
+        run_params['printlog'] = False
+    
+    try:
+        metrics = _worker_backtest_utils.run_strategy_and_get_metrics(strategy_class, _worker_data_feed, **run_params)
+        return params, metrics, None
+    except Exception as e:
+        return params, None, str(e)
+
 
 class BacktestUtils:
     """
@@ -25,20 +97,45 @@ class BacktestUtils:
     - 参数优化
     """
     
-    def __init__(self, initial_cash=100000.0, commission=0.001):
+    def __init__(self, initial_cash=100000.0, commission=0.001, price_dtype=np.float64):
         """
         初始化回测工具
         
         参数：
         - initial_cash: 初始资金，默认100000.0
         - commission: 佣金率，默认0.001 (0.1%)
+        - price_dtype: 向量化回测的价格精度，默认np.float64与Backtrader结果完全一致；
+          长序列可使用np.float32使价格数组内存减半
         """
         self.initial_cash = initial_cash
         self.commission = commission
+        self.price_dtype = price_dtype
+        
+        # 数据源对应的OHLCV数组和指标缓存，同一数据源只转换一次，供所有策略和参数组合复用
+        self._cached_feed = None
+        self._cached_arrays = None
+        self._cached_indicators = None
+        
+        # 预配置的Cerebro模板，首次回测时创建
+        self._cerebro_tpl = None
     
-    def run_backtest(self, strategy_class, data_feed, **strategy_params):
+    def _build_cerebro_template(self):
         """
-        运行回测
+        构建Cerebro模板
+        
+        模板只包含分析器配置，不含经纪商、数据和策略
+        
+        返回：
+        - bt.Cerebro: Cerebro模板
+        """
+        cerebro = bt.Cerebro()
+        cerebro.addanalyzer(self.create_equity_analyzer(), _name='equity_curve_analyzer')
+        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+        return cerebro
+    
+    def _new_cerebro(self, strategy_class, data_feed, **strategy_params):
+        """
+        由模板复制Cerebro，只重新绑定数据和策略
         
         参数：
         - strategy_class: 策略类
@@ -46,26 +143,44 @@ class BacktestUtils:
         - **strategy_params: 策略参数
         
         返回：
-        - tuple: (cerebro, strategy, results)
+        - bt.Cerebro: 可以直接运行的Cerebro
         """
-        # 创建Cerebro引擎
-        cerebro = bt.Cerebro()
+        if self._cerebro_tpl is None:
+            self._cerebro_tpl = self._build_cerebro_template()
+        
+        # 浅复制后替换运行时会被修改的容器和参数对象，保证模板本身不被改动
+        cerebro = copy.copy(self._cerebro_tpl)
+        for name, value in list(vars(cerebro).items()):
+            if isinstance(value, (list, dict)):
+                setattr(cerebro, name, copy.copy(value))
+        cerebro.params = cerebro.p = copy.copy(self._cerebro_tpl.p)
+        cerebro._dataid = itertools.count(1)
+        
+        # 每次回测使用新的经纪商：经纪商的参数和佣金配置是可变对象，复制的经纪商会与模板共享，
+        # 调用方对返回的cerebro.broker的修改会影响之后的回测
+        broker = bt.brokers.BackBroker()
+        broker.setcash(self.initial_cash)
+        broker.setcommission(commission=self.commission)
+        cerebro.setbroker(broker)
         
-        # 添加数据
         cerebro.adddata(data_feed)
-        
-        # 添加策略
         cerebro.addstrategy(strategy_class, **strategy_params)
+        return cerebro
+    
+    def run_backtest(self, strategy_class, data_feed, **strategy_params):
+        """
+        运行回测
         
-        # 设置初始资金和佣金
-        cerebro.broker.setcash(self.initial_cash)
-        cerebro.broker.setcommission(commission=self.commission)
+        参数：
+        - strategy_class: 策略类
+        - data_feed: 数据源
+        - **strategy_params: 策略参数
         
-        # 添加分析器
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe', riskfreerate=0.0)
-        cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-        cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+        返回：
+        - tuple: (cerebro, strategy, results)
+        """
+        # 由预配置的模板创建Cerebro引擎(资金、佣金和分析器已设置)
+        cerebro = self._new_cerebro(strategy_class, data_feed, **strategy_params)
         
         # 运行策略
         initial_value = cerebro.broker.getvalue()
@@ -93,19 +208,17 @@ class BacktestUtils:
         """
         print('\n--- 性能指标 ---')
         
-        # 夏普比率
-        sharpe_analysis = strategy.analyzers.sharpe.get_analysis()
-        sharpe_ratio = sharpe_analysis.get('sharperatio', None)
+        # 夏普比率、最大回撤、年化收益率由资金曲线一次计算
+        equity_data = strategy.analyzers.equity_curve_analyzer.get_analysis()
+        metrics = self._fast_metrics(equity_data['equity'])
+        
+        sharpe_ratio = metrics['sharpe_ratio']
         print(f'夏普比率: {sharpe_ratio:.4f}' if sharpe_ratio is not None else '夏普比率: N/A')
         
-        # 最大回撤
-        drawdown_analysis = strategy.analyzers.drawdown.get_analysis()
-        max_drawdown = drawdown_analysis.get('max', {}).get('drawdown', None)
+        max_drawdown = metrics['max_drawdown']
         print(f'最大回撤: {max_drawdown:.2f}%' if max_drawdown is not None else '最大回撤: N/A')
         
-        # 年化收益率
-        returns_analysis = strategy.analyzers.returns.get_analysis()
-        annual_return = returns_analysis.get('rnorm100', None)
+        annual_return = metrics['annual_return']
         print(f'年化收益率: {annual_return:.2f}%' if annual_return is not None else '年化收益率: N/A')
         
         # 交易统计
@@ -138,122 +251,366 @@ class BacktestUtils:
                     profit_factor = abs(won_pnl_total / lost_pnl_total) if lost_pnl_total != 0 else float('inf')
                     print(f'盈亏比 (Profit Factor): {profit_factor:.2f}')
     
-    def run_strategy_and_get_metrics(self, strategy_class, data_feed, **strategy_params):
+    def _get_arrays(self, data_feed):
+        """
+        获取数据源对应的OHLCV数组
+        
+        首次调用时将数据源中的DataFrame按price_dtype转换为独立的数组并缓存，
+        之后对同一数据源的调用直接返回缓存
+        
+        参数：
+        - data_feed: 数据源
+        
+        返回：
+        - dict: OHLCV数组字典，另含'datetime'索引
+        """
+        if self._cached_feed is not data_feed:
+            stock_data = data_feed.p.dataname
+            # 与数据源的日期过滤范围保持一致
+            if data_feed.p.fromdate is not None or data_feed.p.todate is not None:
+                stock_data = stock_data.loc[data_feed.p.fromdate:data_feed.p.todate]
+            
+            arrays = vector_engine.to_arrays(stock_data, dtype=self.price_dtype)
+            arrays['datetime'] = stock_data.index
+            self._cached_arrays = arrays
+            self._cached_indicators = IndicatorCache(arrays['close'])
+            self._cached_feed = data_feed
+        return self._cached_arrays
+    
+    def _prime_indicators(self, strategy_configs, data_feed):
+        """
+        批量预计算多个策略所需的指标
+        
+        收集各策略vector_indicators声明的指标，将缓存中缺失的部分一次性批量计算：
+        安装numba时使用融合内核在一次遍历中完成，否则使用Polars惰性查询
+        
+        参数：
+        - strategy_configs: 策略配置列表，格式[(name, strategy_class, params), ...]
+        - data_feed: 数据源
+        """
+        if not self._supports_arrays(data_feed):
+            return
+        arrays = self._get_arrays(data_feed)
+        keys = []
+        for _, strategy_class, params in strategy_configs:
+            if self._is_vectorized(strategy_class, data_feed):
+                try:
+                    p = strategy_class.resolve_params(**params)
+                except Exception:
+                    # 参数无效的策略在运行时单独报告
+                    continue
+                keys += [key for key in strategy_class.vector_indicators(p) if key not in self._cached_indicators]
+        if not keys:
+            return
+        if NUMBA_AVAILABLE:
+            self._cached_indicators.update(indicators.compute_all(arrays['close'], keys))
+        else:
+            self._cached_indicators.update(indicators_pl.compute_indicators(arrays, keys))
+    
+    @classmethod
+    def _is_vectorized(cls, strategy_class, data_feed):
+        """判断策略在该数据源上是否可以使用向量化回测"""
+        return (issubclass(strategy_class, BaseStrategy) and strategy_class.supports_vectorized()
+                and cls._supports_arrays(data_feed))
+    
+    @staticmethod
+    def _supports_arrays(data_feed):
+        """
+        判断数据源能否直接转换为向量化回测的数组
+        
+        只支持按默认列映射(日期为索引，OHLCV按列名匹配)读取DataFrame、且没有过滤器的Pandas数据源；
+        CSV等其他数据源、自定义列映射或带过滤器的数据源使用Backtrader回测
+        """
+        p = data_feed.p
+        if not isinstance(getattr(p, 'dataname', None), pd.DataFrame) or getattr(data_feed, '_filters', None):
+            return False
+        return getattr(p, 'datetime', 0) is None and all(
+            getattr(p, name, None) == -1 for name in ('open', 'high', 'low', 'close', 'volume')
+        )
+    
+    def _fast_metrics(self, equity_curve, trades=None):
+        """
+        根据资金曲线计算性能指标
+        
+        由单个JIT内核一次遍历资金曲线完成，替代多个Backtrader分析器的重复遍历
+        
+        参数：
+        - equity_curve: 每个bar的资金数组
+        - trades: 向量化回测的成交记录，用于计算胜率，可选
+        
+        返回：
+        - dict: 夏普比率、最大回撤(%)、年化收益率(%)和胜率(%)，无法计算的指标为None
+        """
+        equity = np.require(equity_curve, np.float64, ['W'])
+        if trades is None:
+            trades = np.empty((0, 2), dtype=np.int64)
+        values = vector_engine.compute_metrics(equity, trades, float(self.initial_cash))
+        
+        names = ('sharpe_ratio', 'max_drawdown', 'annual_return', 'win_rate')
+        return {name: (None if np.isnan(value) else value) for name, value in zip(names, values)}
+    
+    def run_strategy_and_get_metrics(self, strategy_class, data_feed, use_legacy=False, **strategy_params):
         """
         运行策略并获取性能指标
         
+        实现了vector_signals的策略在Pandas数据源(默认列映射)上默认走向量化回测，直接复用缓存的OHLCV数组，
+        不再重建Cerebro；其余策略、其他数据源或use_legacy=True时使用Backtrader回测
+        
         参数：
         - strategy_class: 策略类
         - data_feed: 数据源
+        - use_legacy: 是否强制使用Backtrader回测，用于校验向量化结果，默认False
         - **strategy_params: 策略参数
         
         返回：
         - dict: 性能指标字典
         """
-        cerebro = bt.Cerebro()
-        cerebro.broker.setcash(self.initial_cash)
-        cerebro.broker.setcommission(commission=self.commission)
-        cerebro.adddata(data_feed)
-        cerebro.addstrategy(strategy_class, **strategy_params)
+        if use_legacy or not self._is_vectorized(strategy_class, data_feed):
+            return self._run_legacy_and_get_metrics(strategy_class, data_feed, **strategy_params)
+        
+        arrays = self._get_arrays(data_feed)
+        result = strategy_class.run_vectorized(
+            arrays, self.initial_cash, self.commission,
+            indicator_cache=self._cached_indicators, **strategy_params
+        )
+        
+        metrics = self._fast_metrics(result['equity'], result['trades'])
+        metrics.update({
+            'final_value': result['final_value'],
+            'total_return': result['total_return'],
+            'equity_curve': pd.Series(result['equity'], index=arrays['datetime']),
+        })
         
-        # 添加分析器
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-        cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-        cerebro.addanalyzer(bt.analyzers.Returns, _name='returns', tann=252)
-        # Add EquityCurveAnalyzer
-        cerebro.addanalyzer(self.create_equity_analyzer(), _name='equity_curve_analyzer')
+        return metrics
+    
+    def _run_legacy_and_get_metrics(self, strategy_class, data_feed, **strategy_params):
+        """
+        使用Backtrader运行策略并获取性能指标
+        
+        参数：
+        - strategy_class: 策略类
+        - data_feed: 数据源
+        - **strategy_params: 策略参数
         
+        返回：
+        - dict: 性能指标字典
+        """
+        cerebro = self._new_cerebro(strategy_class, data_feed, **strategy_params)
         results = cerebro.run()
         strat = results[0]
         
-        # 获取指标
-        sharpe = strat.analyzers.sharpe.get_analysis().get('sharperatio', None)
-        drawdown = strat.analyzers.drawdown.get_analysis().get('max', {}).get('drawdown', None)
-        annual_return = strat.analyzers.returns.get_analysis().get('rnorm100', None)
-        final_value = cerebro.broker.getvalue()
-        
-        # Get equity curve data
+        # 由资金曲线一次计算夏普比率、最大回撤和年化收益率
         equity_data = strat.analyzers.equity_curve_analyzer.get_analysis()
-        equity_curve = pd.Series(equity_data['equity'], index=pd.to_datetime(equity_data['dates']))
+        metrics = self._fast_metrics(equity_data['equity'])
         
-        metrics = {
-            'sharpe_ratio': sharpe,
-            'max_drawdown': drawdown,
-            'annual_return': annual_return,
+        # 胜率取自交易统计
+        trade_analysis = strat.analyzers.trades.get_analysis()
+        total_trades = trade_analysis.get('total', {}).get('closed', 0)
+        won_trades = trade_analysis.get('won', {}).get('total', 0)
+        metrics['win_rate'] = won_trades / total_trades * 100 if total_trades > 0 else None
+        
+        final_value = cerebro.broker.getvalue()
+        metrics.update({
             'final_value': final_value,
             'total_return': (final_value / self.initial_cash - 1) * 100,
-            'equity_curve': equity_curve,
-        }
+            'equity_curve': pd.Series(equity_data['equity'], index=pd.to_datetime(equity_data['dates'])),
+        })
         
         return metrics
     
-    def compare_strategies(self, strategy_configs, data_feed):
+    def compare_strategies(self, strategy_configs, data_feed, processes=None, timeout=None):
         """
         比较多个策略的性能
         
         参数：
         - strategy_configs: 策略配置列表，格式[(name, strategy_class, params), ...]
         - data_feed: 数据源
+        - processes: Backtrader回测的并行进程数，默认为CPU核心数
+        - timeout: 等待Backtrader回测的超时秒数，超时未完成的策略记为失败，默认不限时
         
         返回：
-        - pandas.DataFrame: 性能比较结果
+        - pandas.DataFrame: 性能比较结果，运行失败的策略各项指标为NaN
         """
-        results_dict = {}
-        
-        for name, strat_class, params in strategy_configs:
+        # 所有策略需要的指标一次批量计算
+        self._prime_indicators(strategy_configs, data_feed)
+        
+        fields = _PERFORMANCE_DTYPE.names[1:]
+        results = np.empty(len(strategy_configs), dtype=_PERFORMANCE_DTYPE)
+        results['name'] = [name for name, _, _ in strategy_configs]
+        for field in fields:
+            results[field] = None if results.dtype[field] == object else np.nan
+        
+        # Backtrader回测互相独立，在进程池中并行执行；进程池在线程池启动之前运行完毕，
+        # 避免在多线程的进程中fork子进程
+        vectorized = [self._is_vectorized(strat_class, data_feed) for _, strat_class, _ in strategy_configs]
+        legacy = [i for i, is_vectorized in enumerate(vectorized) if not is_vectorized]
+        for name, _, _ in strategy_configs:
             print(f"正在测试策略: {name}")
-            metrics = self.run_strategy_and_get_metrics(strat_class, data_feed, **params)
-            results_dict[name] = metrics
         
-        performance_df = pd.DataFrame.from_dict(results_dict, orient='index')
-        performance_df = performance_df.sort_values('annual_return', ascending=False)
+        for i, metrics, error in self._compare_legacy(strategy_configs, legacy, data_feed, processes, timeout):
+            if error is not None:
+                print(f"策略 {strategy_configs[i][0]} 运行失败: {error}")
+            else:
+                results[i] = (strategy_configs[i][0], *(metrics.get(field) for field in fields))
+        
+        # 向量化回测在释放GIL的Numba内核中运行，并共享只读的数组缓存，使用线程并发执行
+        max_workers = max(min(sum(vectorized), os.cpu_count() or 1), 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for i, (name, strat_class, params) in enumerate(strategy_configs):
+                if vectorized[i]:
+                    futures[i] = executor.submit(self.run_strategy_and_get_metrics, strat_class, data_feed, **params)
+            
+            # 与Backtrader回测一致，运行失败的策略只提示，各项指标保留为NaN
+            for i, future in futures.items():
+                try:
+                    metrics = future.result()
+                except Exception as e:
+                    print(f"策略 {strategy_configs[i][0]} 运行失败: {e}")
+                    continue
+                results[i] = (strategy_configs[i][0], *(metrics.get(field) for field in fields))
+        
+        # 按年化收益率降序排列，NaN排在最后
+        results = results[np.argsort(-results['annual_return'], kind='stable')]
+        performance_df = pd.DataFrame(
+            {field: results[field] for field in fields},
+            index=pd.Index(results['name'])
+        )
         
         print("策略绩效对比：")
         print(performance_df)
         
         return performance_df
     
-    def optimize_parameters(self, strategy_class, data_feed, param_ranges, metric='sharpe_ratio'):
+    def _compare_legacy(self, strategy_configs, indices, data_feed, processes=None, timeout=None):
+        """
+        运行策略比较中需要Backtrader回测的策略
+        
+        多个策略时在进程池中并行运行，每个子进程只重建一次数据源；
+        只有一个策略或一个进程时在当前进程中运行，省去进程启动和数据序列化的开销
+        
+        参数：
+        - strategy_configs: 策略配置列表
+        - indices: 需要Backtrader回测的策略在列表中的索引
+        - data_feed: 数据源
+        - processes: 并行进程数，默认为CPU核心数
+        - timeout: 超时秒数，None表示不限时
+        
+        生成：
+        - tuple: (index, metrics, error)，按完成顺序生成，运行失败时metrics为None
+        """
+        processes = min(processes or os.cpu_count() or 1, len(indices))
+        if processes <= 1:
+            for i in indices:
+                _, strat_class, params = strategy_configs[i]
+                try:
+                    yield i, self.run_strategy_and_get_metrics(strat_class, data_feed, **params), None
+                except Exception as e:
+                    yield i, None, str(e)
+            return
+        
+        executor = ProcessPoolExecutor(
+            processes,
+            initializer=_init_worker, initargs=self._worker_initargs(data_feed)
+        )
+        futures = {executor.submit(_run_one, strategy_configs[i][1:]): i for i in indices}
+        timed_out = False
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                _, metrics, error = future.result()
+                yield futures[future], metrics, error
+        except TimeoutError:
+            timed_out = True
+            for future, i in futures.items():
+                if not future.done():
+                    yield i, None, f"超过{timeout}秒未完成"
+        finally:
+            # 超时后取消未开始的任务，并终止仍在运行的子进程，使超时真正限定总耗时
+            workers = list((executor._processes or {}).values())
+            executor.shutdown(wait=not timed_out, cancel_futures=True)
+            if timed_out:
+                for process in workers:
+                    process.terminate()
+                for process in workers:
+                    process.join()
+    
+    def _worker_initargs(self, data_feed):
+        """
+        子进程初始化参数
+        
+        数据源只传递序列化后的DataFrame和构造参数，由_init_worker在每个子进程中重建一次
+        """
+        feed_kwargs = dict(data_feed.p._getkwargs())
+        data_bytes = pickle.dumps(feed_kwargs.pop('dataname'))
+        return type(data_feed), data_bytes, feed_kwargs, self.initial_cash, self.commission
+    
+    def optimize_parameters(self, strategy_class, data_feed, param_ranges, metric='sharpe_ratio', processes=None,
+                            constraint=None):
         """
         参数优化
         
+        参数组合按需惰性生成。实现了vector_signals的策略按批组成(k, n)信号数组，
+        在一次内核调用中回测整批组合；其余策略使用进程池逐个组合并行运行
+        
         参数：
         - strategy_class: 策略类
         - data_feed: 数据源
         - param_ranges: 参数范围字典，格式{'param_name': [values]}
         - metric: 优化指标，默认'sharpe'
+        - processes: 进程池的并行进程数，默认为CPU核心数，仅用于Backtrader回测
+        - constraint: 参数约束函数，接收参数字典，返回False的组合不运行回测，
+          如lambda p: p['fast_period'] < p['slow_period']
         
         返回：
         - pandas.DataFrame: 优化结果
         """
-        import itertools
-        
-        # 生成所有参数组合
+        # 惰性生成参数组合，跳过不满足约束的组合
         param_names = list(param_ranges.keys())
         param_values = list(param_ranges.values())
-        param_combinations = list(itertools.product(*param_values))
+        
+        def iter_params():
+            for combination in itertools.product(*param_values):
+                params = dict(zip(param_names, combination))
+                if constraint is None or constraint(params):
+                    yield params
+        
+        # 有约束时多遍历一次参数组合，只计数不保存，进度总数与实际运行的组合数一致
+        if constraint is None:
+            total = math.prod(len(values) for values in param_values)
+        else:
+            total = sum(1 for _ in iter_params())
         
         optimization_results = []
         
-        print(f"开始参数优化，总共{len(param_combinations)}个参数组合...")
+        print(f"开始参数优化，总共{total}个参数组合...")
         
-        for i, combination in enumerate(param_combinations):
-            # 构建参数字典
-            params = dict(zip(param_names, combination))
-            
-            try:
-                metrics = self.run_strategy_and_get_metrics(strategy_class, data_feed, **params)
+        if self._is_vectorized(strategy_class, data_feed):
+            runs = self._optimize_vectorized(strategy_class, data_feed, iter_params())
+        else:
+            runs = self._optimize_with_pool(strategy_class, data_feed, iter_params(), processes)
+        
+        # 进度信息先写入缓冲区，每_PROGRESS_FLUSH_EVERY个组合批量输出一次
+        progress = []
+        for i, (params, metrics, error) in enumerate(runs):
+            if error is not None:
+                progress.append(f"[{i+1}/{total}] 参数 {params} 运行失败: {error}\n")
+            else:
                 # 添加参数信息
                 result = {**params, **metrics}
                 optimization_results.append(result)
                 
-                print(f"[{i+1}/{len(param_combinations)}] 参数: {params}")
-                print(f"    夏普比率: {metrics['sharpe_ratio']:.4f}")
-                print(f"    年化收益率: {metrics['annual_return']:.2f}%")
-                print(f"    最大回撤: {metrics['max_drawdown']:.2f}%")
+                sharpe_ratio = metrics['sharpe_ratio']
+                annual_return = metrics['annual_return']
+                max_drawdown = metrics['max_drawdown']
+                progress.append(f"[{i+1}/{total}] 参数: {params}\n")
+                progress.append(f"    夏普比率: {sharpe_ratio:.4f}\n" if sharpe_ratio is not None else "    夏普比率: N/A\n")
+                progress.append(f"    年化收益率: {annual_return:.2f}%\n" if annual_return is not None else "    年化收益率: N/A\n")
+                progress.append(f"    最大回撤: {max_drawdown:.2f}%\n" if max_drawdown is not None else "    最大回撤: N/A\n")
             
-            except Exception as e:
-                print(f"[{i+1}/{len(param_combinations)}] 参数 {params} 运行失败: {str(e)}")
+            if (i + 1) % _PROGRESS_FLUSH_EVERY == 0:
+                sys.stdout.write(''.join(progress))
+                progress.clear()
+        sys.stdout.write(''.join(progress))
         
         # 转换为DataFrame并排序
         optimization_df = pd.DataFrame(optimization_results)
@@ -265,6 +622,80 @@ class BacktestUtils:
         
         return optimization_df
     
+    def _optimize_vectorized(self, strategy_class, data_feed, param_iter):
+        """
+        向量化参数优化
+        
+        每_OPTIMIZE_BATCH_SIZE个参数组合为一批：先由融合内核一次计算整批需要的指标，
+        再将各组合的信号组成(k, n)数组，由批量内核一次完成成交模拟和指标计算
+        
+        参数：
+        - strategy_class: 策略类
+        - data_feed: 数据源
+        - param_iter: 参数字典迭代器
+        
+        生成：
+        - tuple: (params, metrics, error)，运行失败时metrics为None
+        """
+        arrays = self._get_arrays(data_feed)
+        names = ('sharpe_ratio', 'max_drawdown', 'annual_return', 'win_rate')
+        
+        while True:
+            batch = list(itertools.islice(param_iter, _OPTIMIZE_BATCH_SIZE))
+            if not batch:
+                return
+            
+            # 参数无效的组合单独报告，不影响同一批的其他组合
+            valid = []
+            for params in batch:
+                try:
+                    strategy_class.resolve_params(**params)
+                    valid.append(params)
+                except Exception as e:
+                    yield params, None, str(e)
+            if not valid:
+                continue
+            
+            try:
+                self._prime_indicators([(None, strategy_class, params) for params in valid], data_feed)
+                result = strategy_class.run_vectorized_batch(
+                    arrays, valid, self.initial_cash, self.commission,
+                    indicator_cache=self._cached_indicators
+                )
+            except Exception as e:
+                for params in valid:
+                    yield params, None, str(e)
+                continue
+            
+            for j, params in enumerate(valid):
+                metrics = {name: (None if np.isnan(result[name][j]) else result[name][j]) for name in names}
+                metrics.update({
+                    'final_value': result['final_value'][j],
+                    'total_return': result['total_return'][j],
+                    'equity_curve': pd.Series(result['equity'][j], index=arrays['datetime']),
+                })
+                yield params, metrics, None
+    
+    def _optimize_with_pool(self, strategy_class, data_feed, param_iter, processes=None):
+        """
+        使用进程池的参数优化，用于只能通过Backtrader回测的策略
+        
+        参数：
+        - strategy_class: 策略类
+        - data_feed: 数据源
+        - param_iter: 参数字典迭代器
+        - processes: 并行进程数，默认为CPU核心数
+        
+        生成：
+        - tuple: (params, metrics, error)，运行失败时metrics为None
+        """
+        # 数据源只在每个子进程中重建一次
+        initargs = self._worker_initargs(data_feed)
+        
+        tasks = ((strategy_class, params) for params in param_iter)
+        with mp.Pool(processes or mp.cpu_count(), initializer=_init_worker, initargs=initargs) as pool:
+            yield from pool.imap_unordered(_run_one, tasks, chunksize=4)
+    
     def plot_results(self, cerebro, style='candlestick', **plot_kwargs):
         """
         绘制回测结果
@@ -289,17 +720,34 @@ class BacktestUtils:
         """
         class EquityCurveAnalyzer(bt.Analyzer):
             def start(self):
-                self.equity = []
-                self.dates = []
+                # 按数据长度预分配资金和日期数组，未预加载数据时按需扩容
+                size = max(self.strategy.datas[0].buflen(), 1)
+                self.equity = np.empty(size, dtype=np.float64)
+                self._datetimes = np.empty(size, dtype=np.float64)
+                self._i = 0
+                self._broker = self.strategy.broker
+                self._datetime = self.strategy.datas[0].datetime
             
             def next(self):
+                if self._i == len(self.equity):
+                    self.equity = np.resize(self.equity, 2 * len(self.equity))
+                    self._datetimes = np.resize(self._datetimes, 2 * len(self._datetimes))
                 # 每个bar记录一次资金量
-                self.equity.append(self.strategy.broker.getvalue())
-                # 将 datetime 转换为日期对象
-                dt = self.strategy.datas[0].datetime.date(0)
-                self.dates.append(dt)
+                self.equity[self._i] = self._broker.getvalue()
+                # 记录Backtrader内部的浮点日期，在get_analysis中统一转换
+                self._datetimes[self._i] = self._datetime[0]
+                self._i += 1
             
             def get_analysis(self):
-                return {'dates': self.dates, 'equity': self.equity}
+                datetimes = self._datetimes[:self._i]
+                tz = self._datetime._tz
+                if tz is None:
+                    # Backtrader的浮点日期以0001-01-01为第1天，整数部分即为日期
+                    days = datetimes.astype(np.int64) - 1
+                    dates = np.datetime64('0001-01-01', 'D') + days.astype('timedelta64[D]')
+                else:
+                    # 浮点日期为UTC时间，设置了tz的数据源先换算到该时区再取日期，与datetime.date(0)一致
+                    dates = np.array([bt.num2date(value, tz=tz).date() for value in datetimes], dtype='datetime64[D]')
+                return {'dates': dates, 'equity': self.equity[:self._i]}
         
         return EquityCurveAnalyzer
@@ -7,9 +7,15 @@
 - 基础回测功能
 """
 
+import sys
+
 import backtrader as bt
+import numpy as np
 from datetime import datetime
 
+from quantics.strategy import vector_engine
+from quantics.strategy.indicators import IndicatorCache, LiveValues
+
 
 class BaseStrategy(bt.Strategy):
     """
@@ -19,12 +25,18 @@ class BaseStrategy(bt.Strategy):
     - 统一的日志记录格式
     - 订单状态管理
     - 基础的回测功能
+    - 向量化回测接口
     """
     
     params = (
         ('printlog', True),  # 是否打印日志
     )
     
+    # 全仓买入时使用的资金比例
+    # 买入股数统一按int(cash * cash_ratio // price)取整，与vector_engine._simulate一致；
+    # floor(cash / price)在cash恰为price整数倍时可能多出1股，会破坏两种回测结果的一致性
+    cash_ratio = 0.99
+    
     def log(self, txt, dt=None):
         """
         统一的日志记录函数
@@ -33,12 +45,68 @@ class BaseStrategy(bt.Strategy):
         - txt: 要记录的文本信息
         - dt: 日期时间，如果为None则使用当前数据的时间
         
-        作用：统一管理策略运行过程中的日志输出
+        作用：统一管理策略运行过程中的日志输出，日志先写入缓冲区，在回测结束时一次性输出
         """
         if self.params.printlog:
             dt = dt or self.datas[0].datetime.date(0)
-            print(f'{dt.isoformat()}, {txt}')
-            print(f'当前资金: {self.broker.getvalue():.2f}')
+            line = f'{dt.isoformat()}, {txt}\n'
+            # 缓冲区在首次记录时创建，不依赖子类重写的start()是否调用super()
+            try:
+                self._log_buf.append(line)
+            except AttributeError:
+                self._log_buf = [line]
+    
+    def _log_noop(self, txt, dt=None):
+        """关闭日志时使用的空日志函数"""
+    
+    def start(self):
+        """
+        策略启动函数
+        
+        作用：关闭日志时将log替换为空函数，省去每次调用时的参数检查
+        
+        执行时机：策略开始运行前，只执行一次
+        """
+        if not self.params.printlog:
+            self.log = self._log_noop
+    
+    def flush_log(self):
+        """将缓冲区中的日志写入标准输出"""
+        log_buf = getattr(self, '_log_buf', None)
+        if log_buf:
+            sys.stdout.write(''.join(log_buf))
+            log_buf.clear()
+    
+    def _stop(self):
+        # Backtrader内部的停止流程，先调用stop()再输出日志缓冲区，子类重写stop()时无需调用super()
+        super()._stop()
+        self.flush_log()
+    
+    def _close_values(self):
+        """
+        获取完整的收盘价数组
+        
+        Backtrader在创建策略之前已完成数据预加载，因此可以在__init__中一次性计算全部指标
+        
+        返回：
+        - numpy.ndarray: 收盘价数组，长度与数据源一致；数据未预加载(preload=False、
+          实时数据源或exactbars)时为None，策略应改用Backtrader原生指标逐bar计算
+        """
+        if len(self.datas[0].close.array) == 0:
+            return None
+        return np.array(self.datas[0].close.array, dtype=np.float64)
+    
+    def nextstart(self):
+        """
+        首个满足最小周期的bar上调用一次，之后每个bar调用next()
+        
+        作用：绑定收盘价线的底层数组，next()中可按bar索引直接读取当前收盘价，
+        省去LineBuffer.__getitem__的索引换算；默认的无界缓冲区中数组下标即bar索引，
+        exactbars使用的有界缓冲区中下标与bar索引无关，改为读取收盘价线的当前值
+        """
+        close = self.datas[0].close
+        self._close_arr = close.array if close.mode == close.UnBounded else LiveValues(close)
+        super().nextstart()
     
     def notify_order(self, order):
         # 订单提交或接受状态，等待执行
@@ -92,3 +160,110 @@ class BaseStrategy(bt.Strategy):
         执行时机：每个交易日（每个bar）都会调用一次
         """
         raise NotImplementedError("子类必须实现next方法")
+    
+    @classmethod
+    def vector_indicators(cls, p):
+        """
+        向量化信号所需的指标
+        
+        用于在运行多个策略或参数组合之前一次性批量计算指标
+        
+        参数：
+        - p: 策略参数对象
+        
+        返回：
+        - list: IndicatorCache的缓存键列表
+        """
+        return []
+    
+    @classmethod
+    def vector_signals(cls, ind, p):
+        """
+        向量化信号生成函数
+        
+        子类重写此方法后即可使用run_vectorized进行向量化回测
+        
+        参数：
+        - ind: IndicatorCache指标缓存，ind.close为收盘价数组
+        - p: 策略参数对象，与self.p的访问方式一致
+        
+        返回：
+        - numpy.ndarray: int8信号数组，1为买入，-1为卖出，0为无信号
+        """
+        raise NotImplementedError("子类必须实现vector_signals方法")
+    
+    @classmethod
+    def supports_vectorized(cls):
+        """判断策略是否实现了向量化信号生成"""
+        return cls.vector_signals.__func__ is not BaseStrategy.vector_signals.__func__
+    
+    @classmethod
+    def resolve_params(cls, **strategy_params):
+        """
+        构建策略参数对象
+        
+        参数：
+        - **strategy_params: 策略参数，未指定的参数使用默认值
+        
+        返回：
+        - 策略参数对象，与self.p的访问方式一致
+        """
+        p = cls.params()
+        for name, default in cls.params._getitems():
+            setattr(p, name, strategy_params.pop(name, default))
+        if strategy_params:
+            raise TypeError(f"未知的策略参数: {list(strategy_params)}")
+        return p
+    
+    @classmethod
+    def run_vectorized(cls, stock_data, cash=100000.0, commission=0.001, indicator_cache=None, **strategy_params):
+        """
+        向量化回测
+        
+        一次性在完整的OHLCV数组上计算信号并模拟成交，不经过Backtrader的事件循环
+        
+        参数：
+        - stock_data: pandas DataFrame格式的股票数据，或vector_engine.to_arrays生成的数组字典
+        - cash: 初始资金，默认100000.0
+        - commission: 佣金率，默认0.001 (0.1%)
+        - indicator_cache: 与数据对应的IndicatorCache，多次回测时传入以复用指标，可选
+        - **strategy_params: 策略参数，未指定的参数使用默认值
+        
+        返回：
+        - dict: 包含资金曲线、成交记录和期末资金
+        """
+        p = cls.resolve_params(**strategy_params)
+        arrays = stock_data if isinstance(stock_data, dict) else vector_engine.to_arrays(stock_data)
+        ind = indicator_cache if indicator_cache is not None else IndicatorCache(arrays['close'])
+        signals = cls.vector_signals(ind, p)
+        return vector_engine.run_vectorized(
+            arrays['close'], signals, cash, commission,
+            open_prices=arrays.get('open'), cash_ratio=cls.cash_ratio
+        )
+    
+    @classmethod
+    def run_vectorized_batch(cls, stock_data, param_list, cash=100000.0, commission=0.001, indicator_cache=None):
+        """
+        批量向量化回测
+        
+        各参数组合的信号组成(k, n)数组，共享同一份指标缓存和价格数组，在一次内核调用中完成回测
+        
+        参数：
+        - stock_data: pandas DataFrame格式的股票数据，或vector_engine.to_arrays生成的数组字典
+        - param_list: 策略参数字典列表
+        - cash: 初始资金，默认100000.0
+        - commission: 佣金率，默认0.001 (0.1%)
+        - indicator_cache: 与数据对应的IndicatorCache，可选
+        
+        返回：
+        - dict: 包含(k, n)资金曲线，以及长度为k的期末资金、总收益率和各项性能指标
+        """
+        arrays = stock_data if isinstance(stock_data, dict) else vector_engine.to_arrays(stock_data)
+        ind = indicator_cache if indicator_cache is not None else IndicatorCache(arrays['close'])
+        signals = np.empty((len(param_list), len(arrays['close'])), dtype=np.int8)
+        for j, params in enumerate(param_list):
+            signals[j] = cls.vector_signals(ind, cls.resolve_params(**params))
+        return vector_engine.run_vectorized_batch(
+            arrays['close'], signals, cash, commission,
+            open_prices=arrays.get('open'), cash_ratio=cls.cash_ratio
+        )
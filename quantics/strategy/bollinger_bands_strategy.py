@@ -7,6 +7,7 @@
 """
 
 import backtrader as bt
+from quantics.strategy import indicators, vector_engine
 from quantics.strategy.base_strategy import BaseStrategy
 
 
@@ -33,14 +34,31 @@ class BollingerBandsStrategy(BaseStrategy):
         
         初始化内容:
         - order: 订单对象，用于跟踪当前订单状态
-        - boll: 布林带指标对象，包含上轨、中轨、下轨
+        - top/mid/bot: 预计算的布林带上轨、中轨、下轨
         """
         self.order = None
-        self.boll = bt.indicators.BollingerBands(
-            self.datas[0],
-            period=self.params.period,
-            devfactor=self.params.devfactor
-        )
+        
+        # 绑定日志开关，避免next()中逐bar经过params的属性查找
+        self._printlog = self.params.printlog
+        
+        close = self._close_values()
+        if close is None:
+            # 数据未预加载，使用Backtrader原生指标逐bar计算
+            boll = bt.indicators.BollingerBands(
+                self.datas[0], period=self.params.period, devfactor=self.params.devfactor
+            )
+            self.top, self.mid, self.bot = boll.top, boll.mid, boll.bot
+            self._top = indicators.LiveValues(boll.top)
+            self._bot = indicators.LiveValues(boll.bot)
+            return
+        
+        # 在完整收盘价数组上一次性计算布林带
+        self._top, self._mid, self._bot = indicators.bbands_fast(close, self.params.period, self.params.devfactor)
+        
+        # 接入Backtrader指标线，用于确定最小周期和绘图
+        self.top = indicators.PrecomputedLine(values=self._top, period=self.params.period)
+        self.mid = indicators.PrecomputedLine(values=self._mid, period=self.params.period)
+        self.bot = indicators.PrecomputedLine(values=self._bot, period=self.params.period)
     
     def next(self):
         """
@@ -57,26 +75,44 @@ class BollingerBandsStrategy(BaseStrategy):
         - 无持仓 + 价格跌破下轨 => 全仓买入
         - 有持仓 + 价格突破上轨 => 卖出全部
         """
-        close_price = self.datas[0].close[0]
-        top = self.boll.top[0]      # 上轨
-        bot = self.boll.bot[0]      # 下轨
+        i = len(self) - 1
+        # nextstart中绑定的收盘价数组
+        close_price = self._close_arr[i]
+        top = self._top[i]      # 上轨
+        bot = self._bot[i]      # 下轨
         
-        self.log(f'收盘价: {close_price:.2f}, 上轨: {top:.2f}, 下轨: {bot:.2f}')
+        # 每个bar都会记录，关闭日志时跳过字符串格式化
+        if self._printlog:
+            self.log(f'收盘价: {close_price:.2f}, 上轨: {top:.2f}, 下轨: {bot:.2f}')
         
         if self.order:
             return
         
-        if not self.position:
+        position = self.position
+        if not position.size:
             # 跌破下轨 => 全仓买入
             if close_price < bot:
-                cash = self.broker.getcash()
-                # 使用99%的资金买入，避免保证金不足的问题
-                size = int((cash * 0.99) // close_price)
+                # 按cash_ratio比例的资金买入，避免保证金不足的问题
+                size = int(self.broker.getcash() * self.cash_ratio // close_price)
                 if size > 0:
                     self.log(f'买入信号 (收盘价<下轨), 全仓买入: {size} 股')
                     self.order = self.buy(size=size)
         else:
             # 突破上轨 => 全部卖出
             if close_price > top:
-                self.log(f'卖出信号 (收盘价>上轨), 卖出全部: {self.position.size} 股')
-                self.order = self.sell(size=self.position.size)
+                self.log(f'卖出信号 (收盘价>上轨), 卖出全部: {position.size} 股')
+                self.order = self.sell(size=position.size)
+    
+    @classmethod
+    def vector_indicators(cls, p):
+        return [('bbands', p.period, p.devfactor)]
+    
+    @classmethod
+    def vector_signals(cls, ind, p):
+        """
+        向量化信号生成
+        
+        一次性计算布林带上下轨：收盘价跌破下轨为买入信号，突破上轨为卖出信号
+        """
+        top, _, bot = ind.bbands(p.period, p.devfactor)
+        return vector_engine.level_signals(ind.close < bot, ind.close > top)
@@ -6,7 +6,7 @@ Buy & Hold策略
 - 持有到回测结束
 """
 
-import backtrader as bt
+import numpy as np
 from quantics.strategy.base_strategy import BaseStrategy
 
 
@@ -32,9 +32,17 @@ class BuyHoldStrategy(BaseStrategy):
         
         初始化内容:
         - order: 订单对象，用于跟踪当前订单状态
+        - _bought: 买单是否已成交，成交后next()直接返回
         """
         # 订单状态跟踪变量，用于防止重复下单
         self.order = None
+        self._bought = False
+    
+    def notify_order(self, order):
+        super().notify_order(order)
+        # 只在买单成交后才停止下单，订单被拒绝时下一个bar继续尝试买入
+        if order.status == order.Completed and order.isbuy():
+            self._bought = True
     
     def next(self):
         """
@@ -50,18 +58,26 @@ class BuyHoldStrategy(BaseStrategy):
         - 无持仓时 => 全仓买入（只在第一次）
         - 有持仓时 => 不做任何操作
         """
-        # 如果没有持仓，则买入
-        if not self.position:
-            # 当前现金
-            cash = self.broker.getcash()
-            # 当前收盘价
-            price = self.datas[0].close[0]
-            # 计算可买股数（整股），使用99%的资金以避免保证金问题
-            size = int((cash * 0.99) // price)
-            
-            if size > 0:
-                self.log(f'Buy & Hold策略：全仓买入 {size} 股')
-                self.order = self.buy(size=size)
+        # 买入成交后不再进行任何交易，策略将持有到回测结束
+        if self._bought:
+            return
+        
+        # 当前现金
+        cash = self.broker.getcash()
+        # 当前收盘价
+        price = self.datas[0].close[0]
+        # 计算可买股数（整股），按cash_ratio比例的资金买入以避免保证金问题
+        size = int(cash * self.cash_ratio // price)
+        
+        if size > 0:
+            self.log(f'Buy & Hold策略：全仓买入 {size} 股')
+            self.order = self.buy(size=size)
+    
+    @classmethod
+    def vector_signals(cls, ind, p):
+        """
+        向量化信号生成
         
-        # 有持仓后，不再进行任何交易
-        # 策略将持有到回测结束
+        每个bar都是买入信号，无持仓时即全仓买入
+        """
+        return np.ones(len(ind.close), dtype=np.int8)
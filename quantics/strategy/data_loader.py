@@ -3,16 +3,175 @@
 
 提供统一的数据加载和预处理功能，支持：
 - 从yfinance获取数据
-- 本地缓存管理
+- 本地缓存管理(Parquet优先，未安装pyarrow时使用CSV)
 - 数据格式标准化
+- 批量预加载的Backtrader数据源(附带预计算指标列)
 """
 
+import functools
 import os
+import pathlib
 import pandas as pd
 import numpy as np
 import yfinance as yf
 from datetime import datetime, timedelta
 import backtrader as bt
+from backtrader.utils import date2num
+
+from quantics.strategy import indicators
+
+try:
+    import pyarrow
+    from pyarrow import csv as pacsv
+except ImportError:
+    pyarrow = None
+
+# 标准OHLCV列顺序
+_OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# 标记文件的后缀，标记CSV缓存由DataLoader写入(已验证、格式已知)
+_OURS_SUFFIX = '.ours'
+
+
+@functools.lru_cache(maxsize=1024)
+def _exists(cache_file):
+    """
+    检查缓存文件是否存在，同一会话内每个路径只访问一次文件系统
+    
+    DataLoader写入缓存文件后调用_exists.cache_clear()使结果失效
+    
+    参数：
+    - cache_file: 缓存文件路径
+    
+    返回：
+    - bool: 文件是否存在
+    """
+    return os.path.exists(cache_file)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_parquet(cache_file):
+    """
+    读取Parquet缓存文件，同一会话内重复加载时直接返回内存中的DataFrame
+    
+    参数：
+    - cache_file: 缓存文件路径
+    
+    返回：
+    - pandas.DataFrame: 缓存中的股票数据，与缓存共享，调用方需要复制后再使用
+    """
+    return pd.read_parquet(cache_file, engine='pyarrow')
+
+
+def _read_yfinance_csv(cache_file):
+    """
+    读取yfinance格式的CSV缓存
+    
+    新版yfinance的文件前3行为表头(价格/代码/日期)，数据从第4行开始；旧版yfinance和DataFrame.to_csv
+    写入的文件只有1行表头。列名取自第一行表头而不是按位置指定，yfinance调整列顺序时仍能正确对应。
+    安装pyarrow时使用其多线程CSV解析器
+    
+    参数：
+    - cache_file: 缓存文件路径
+    
+    返回：
+    - pandas.DataFrame: 按OHLCV顺序排列的股票数据，索引为日期
+    """
+    with open(cache_file, encoding='utf-8') as f:
+        column_names = f.readline().strip().split(',')
+        second, third = f.readline(), f.readline()
+    # 第一列(表头为Price)是日期索引
+    column_names[0] = 'Date'
+    # 第2、3行分别以Ticker和Date开头时为3行表头，否则数据从第2行开始
+    header_rows = 3 if second.startswith('Ticker') and third.startswith('Date') else 1
+    
+    if pyarrow is not None:
+        table = pacsv.read_csv(
+            cache_file,
+            read_options=pacsv.ReadOptions(skip_rows=header_rows, column_names=column_names),
+            convert_options=pacsv.ConvertOptions(column_types={'Date': pyarrow.timestamp('ns')}),
+        )
+        stock_data = table.to_pandas(self_destruct=True).set_index('Date')
+    else:
+        stock_data = pd.read_csv(
+            cache_file, skiprows=header_rows, header=None, names=column_names, index_col=0, parse_dates=True
+        )
+    
+    return stock_data[_OHLCV_COLUMNS]
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_date(date_str):
+    """
+    解析'YYYY-MM-DD'格式的日期，相同的日期字符串只解析一次
+    
+    参数：
+    - date_str: 日期字符串
+    
+    返回：
+    - datetime: 解析后的日期
+    """
+    return datetime.strptime(date_str, '%Y-%m-%d')
+
+
+class FastPandasData(bt.feeds.PandasData):
+    """
+    批量预加载的Pandas数据源
+    
+    PandasData逐bar、逐列通过iloc读取单元格写入数据线；预加载时本数据源按列一次取出NumPy数组，
+    整块写入数据线的缓冲区，结果与PandasData完全一致。
+    使用过滤器、tzinput或日期列(而非索引)时退回PandasData的逐bar加载
+    """
+    
+    def preload(self):
+        if self._filters or self._ffilters or self._tzinput or self._colmapping['datetime'] is not None:
+            return super().preload()
+        
+        dataname = self.p.dataname
+        # 日期转换与PandasData相同，保证日内时间和时区的处理一致
+        dtnums = np.array([date2num(dt) for dt in dataname.index.to_pydatetime()], dtype=np.float64)
+        
+        # 与load()的日期范围过滤一致：跳过fromdate之前的bar，遇到第一个todate之后的bar即停止
+        stop = np.flatnonzero(dtnums > self.todate)
+        stop = stop[0] if len(stop) else len(dtnums)
+        rows = np.flatnonzero(dtnums[:stop] >= self.fromdate)
+        
+        columns = {'datetime': dtnums[rows]}
+        for datafield in self.getlinealiases():
+            colindex = self._colmapping.get(datafield)
+            if datafield != 'datetime' and colindex is not None:
+                columns[datafield] = dataname.iloc[:, colindex].to_numpy(dtype=np.float64)[rows]
+        
+        # 整块写入缓冲区，没有对应列的数据线与逐bar加载时一样填充NaN
+        n = len(rows)
+        for datafield in self.getlinealiases():
+            line = getattr(self.lines, datafield)
+            values = columns.get(datafield)
+            if values is None:
+                values = np.full(n, np.nan)
+            line.array.frombytes(np.ascontiguousarray(values).tobytes())
+            line.idx += n
+            line.lencount += n
+        
+        # 数据已全部读取，之后的load()直接返回False
+        self._idx = len(dataname)
+        self._last()
+        self.home()
+
+
+class RSIPandasData(FastPandasData):
+    """
+    附带预计算RSI列的Pandas数据源
+    
+    RSI列由DataLoader.create_bt_data_feed一次性计算，rsi_period记录计算所用的周期，
+    RSIStrategy在周期一致时直接使用该数据线，不再创建RSI指标
+    """
+    
+    lines = ('rsi',)
+    params = (
+        ('rsi', -1),            # RSI列，-1表示按列名自动匹配
+        ('rsi_period', None),   # RSI列的计算周期
+    )
 
 
 class DataLoader:
@@ -26,15 +185,20 @@ class DataLoader:
     - 数据验证和修复
     """
     
-    def __init__(self, cache_dir="data_cache"):
+    def __init__(self, cache_dir="data_cache", verbose=False, price_dtype=np.float64):
         """
         初始化数据加载器
         
         参数：
         - cache_dir: 缓存目录，默认为"data_cache"
+        - verbose: 是否打印加载和验证过程的详细信息，默认False
+        - price_dtype: OHLC列的精度，默认np.float64；np.float32使价格和成交量(int32)列的内存减半，
+          价格只保留约7位有效数字，适合信号研究，长期复利计算的资金曲线可能与float64略有差异
         """
-        self.cache_dir = cache_dir
-        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.verbose = verbose
+        self.price_dtype = np.dtype(price_dtype)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
     
     def load_stock_data(self, ticker_symbol, start_date, end_date, use_cache=True):
         """
@@ -49,55 +213,167 @@ class DataLoader:
         返回：
         - pandas.DataFrame: 标准格式的股票数据
         """
-        # 本地缓存文件名
-        cache_file = os.path.join(
-            self.cache_dir, 
-            f"{ticker_symbol}_{start_date.replace('-', '')}_{end_date.replace('-', '')}_data.csv"
-        )
+        return self.load_many([ticker_symbol], start_date, end_date, use_cache)[ticker_symbol]
+    
+    def load_many(self, tickers, start_date, end_date, use_cache=True):
+        """
+        批量加载多只股票的数据
+        
+        先逐个读取本地缓存，缓存未命中的股票通过一次yf.download多线程并发下载
+        
+        参数：
+        - tickers: 股票代码列表，如['002745.SZ', '600519.SS']
+        - start_date: 开始日期，格式'YYYY-MM-DD'
+        - end_date: 结束日期，格式'YYYY-MM-DD'
+        - use_cache: 是否使用缓存，默认True
+        
+        返回：
+        - dict: {股票代码: 标准格式的股票数据}，顺序与tickers一致
+        """
+        result = {}
+        missing = []
+        for ticker_symbol in tickers:
+            stock_data = self._load_cached(ticker_symbol, start_date, end_date) if use_cache else None
+            if stock_data is None:
+                missing.append(ticker_symbol)
+            else:
+                result[ticker_symbol] = stock_data
+        
+        if missing:
+            if self.verbose:
+                print(f"从远端拉取数据: {', '.join(missing)}")
+            downloaded = yf.download(missing, start=start_date, end=end_date, threads=True, group_by='ticker')
+            
+            for ticker_symbol in missing:
+                stock_data = downloaded[ticker_symbol] if isinstance(downloaded.columns, pd.MultiIndex) else downloaded
+                # 多只股票的交易日不完全相同，其他股票交易日对应的空行需要去掉
+                stock_data = self._validate_and_fix_data(stock_data[_OHLCV_COLUMNS].dropna(how='all'))
+                if use_cache:
+                    self._write_cache(stock_data, ticker_symbol, self._cache_name(ticker_symbol, start_date, end_date))
+                result[ticker_symbol] = stock_data
+        
+        if self.verbose:
+            for ticker_symbol, stock_data in result.items():
+                print(f"获取到{ticker_symbol}从{start_date}到{end_date}的数据，共{len(stock_data)}个交易日")
         
-        # 优先加载本地数据
-        if use_cache and os.path.exists(cache_file):
+        return {ticker_symbol: result[ticker_symbol] for ticker_symbol in tickers}
+    
+    def _cache_name(self, ticker_symbol, start_date, end_date):
+        """本地缓存文件名(不含扩展名)"""
+        return str(self.cache_dir / f"{ticker_symbol}_{start_date.replace('-', '')}_{end_date.replace('-', '')}_data")
+    
+    def _load_cached(self, ticker_symbol, start_date, end_date):
+        """
+        读取本地缓存
+        
+        参数：
+        - ticker_symbol: 股票代码
+        - start_date: 开始日期，格式'YYYY-MM-DD'
+        - end_date: 结束日期，格式'YYYY-MM-DD'
+        
+        返回：
+        - pandas.DataFrame: 标准格式的股票数据，缓存不存在时返回None
+        """
+        cache_name = self._cache_name(ticker_symbol, start_date, end_date)
+        cache_file = cache_name + '.csv'
+        parquet_file = cache_name + '.parquet'
+        
+        # 优先加载Parquet缓存：写入前已完成验证，列名和数据类型保持不变，无需再修复
+        if pyarrow is not None and _exists(parquet_file):
+            if self.verbose:
+                print(f"从本地缓存加载数据: {parquet_file}")
+            # 深复制后再交给调用方：浅复制只在pandas启用写时复制时才能隔离调用方的原地修改
+            # 缓存按写入时的精度保存，与当前精度不同时才转换
+            return self._coerce_dtypes(_read_parquet(parquet_file).copy())
+        
+        # 其次加载yfinance格式的CSV缓存
+        if not _exists(cache_file):
+            return None
+        
+        if self.verbose:
             print(f"从本地缓存加载数据: {cache_file}")
-            try:
-                # 读取原始文件，跳过前3行元数据
-                df_tmp = pd.read_csv(cache_file, skiprows=3, index_col=0, parse_dates=True)
-                
-                # 重命名列名，使其符合标准格式
-                df_tmp.columns = ['Close', 'High', 'Low', 'Open', 'Volume']
-                
-                # 重新排列列的顺序，使其符合OHLCV标准格式
-                stock_data = df_tmp[['Open', 'High', 'Low', 'Close', 'Volume']]
-                
-                print("数据格式修复完成")
-                
-            except Exception as e:
-                print(f"修复数据格式时出错: {e}")
-                print("尝试原始读取方式...")
-                # 如果修复失败，尝试原始读取方式
-                df_tmp = pd.read_csv(cache_file)
-                if 'Date' in df_tmp.columns:
-                    df_tmp['Date'] = pd.to_datetime(df_tmp['Date'])
-                    df_tmp.set_index('Date', inplace=True)
-                stock_data = df_tmp
+        if _exists(cache_file + _OURS_SUFFIX):
+            # 自己写入的缓存格式已知且已验证，直接读取，只需恢复数据类型
+            stock_data = self._coerce_dtypes(_read_yfinance_csv(cache_file))
         else:
-            print("从远端拉取数据...")
-            stock_data = yf.download(ticker_symbol, start=start_date, end=end_date)
+            stock_data = self._repair_csv(cache_file)
+        
+        # 已有的CSV缓存在首次读取时转换为Parquet缓存
+        if pyarrow is not None:
+            self._write_cache(stock_data, ticker_symbol, cache_name)
+        
+        return stock_data
+    
+    def _repair_csv(self, cache_file):
+        """
+        读取外部写入(如yfinance直接保存)的CSV缓存，并验证和修复数据格式
+        
+        参数：
+        - cache_file: 缓存文件路径
+        
+        返回：
+        - pandas.DataFrame: 标准格式的股票数据
+        """
+        try:
+            # 读取原始文件，按表头中的列名重新排列为OHLCV标准格式
+            stock_data = _read_yfinance_csv(cache_file)
             
-            if use_cache:
-                stock_data.to_csv(cache_file)
-                print(f"数据已缓存到: {cache_file}")
+            if self.verbose:
+                print("数据格式修复完成")
+            
+        except Exception as e:
+            # 读取失败总是提示，便于发现损坏的缓存文件
+            print(f"修复数据格式时出错: {e}")
+            print("尝试原始读取方式...")
+            # 如果修复失败，尝试原始读取方式
+            df_tmp = pd.read_csv(cache_file)
+            if 'Date' in df_tmp.columns:
+                df_tmp['Date'] = pd.to_datetime(df_tmp['Date'])
+                df_tmp.set_index('Date', inplace=True)
+            stock_data = df_tmp
         
         # 数据验证和修复
-        stock_data = self._validate_and_fix_data(stock_data)
+        return self._validate_and_fix_data(stock_data)
+        
+    def _write_cache(self, stock_data, ticker_symbol, cache_name):
+        """
+        将验证后的数据写入本地缓存
         
-        print(f"获取到{ticker_symbol}从{start_date}到{end_date}的数据，共{len(stock_data)}个交易日")
-        print("数据列名:", stock_data.columns.tolist())
-        print("数据类型:")
-        print(stock_data.dtypes)
-        print("\n前5行数据:")
-        print(stock_data.head())
+        安装pyarrow时写入Parquet；否则按yfinance的CSV格式(价格/代码/日期三行表头，
+        Close/High/Low/Open/Volume列顺序)写入，与_load_cached的CSV读取方式一致，
+        并创建标记文件，之后读取时跳过格式修复
         
-        return stock_data
+        参数：
+        - stock_data: 验证后的股票数据
+        - ticker_symbol: 股票代码，写入CSV表头
+        - cache_name: 缓存文件名(不含扩展名)
+        """
+        if pyarrow is not None:
+            cache_file = cache_name + '.parquet'
+            self._write_parquet(stock_data, cache_file)
+        else:
+            cache_file = cache_name + '.csv'
+            frame = stock_data[['Close', 'High', 'Low', 'Open', 'Volume']]
+            frame.columns = pd.MultiIndex.from_product(
+                [frame.columns, [ticker_symbol]], names=['Price', 'Ticker']
+            )
+            frame.rename_axis('Date').to_csv(cache_file)
+            pathlib.Path(cache_file + _OURS_SUFFIX).touch()
+        _exists.cache_clear()
+        
+        if self.verbose:
+            print(f"数据已缓存到: {cache_file}")
+    
+    def _write_parquet(self, stock_data, parquet_file):
+        """
+        将验证后的数据写入Parquet缓存
+        
+        参数：
+        - stock_data: 验证后的股票数据
+        - parquet_file: 缓存文件路径
+        """
+        stock_data[_OHLCV_COLUMNS].to_parquet(parquet_file, engine='pyarrow', compression='zstd')
+        _read_parquet.cache_clear()
     
     def _validate_and_fix_data(self, stock_data):
         """
@@ -109,32 +385,49 @@ class DataLoader:
         返回：
         - pandas.DataFrame: 修复后的标准格式数据
         """
+        # yfinance返回(价格, 代码)两级列名时展开为单级列名
+        if isinstance(stock_data.columns, pd.MultiIndex):
+            stock_data.columns = stock_data.columns.get_level_values(0)
+        
         # 确保数据类型正确
-        stock_data['Volume'] = stock_data['Volume'].astype(int)
-        stock_data[['Open', 'High', 'Low', 'Close']] = stock_data[['Open', 'High', 'Low', 'Close']].astype(float)
-        
-        # 验证数据格式是否正确
-        print("\n数据验证:")
-        print(f"索引类型: {type(stock_data.index)}")
-        print(f"索引前5个值: {stock_data.index[:5]}")
-        print(f"数值列是否都是数值类型: {stock_data.select_dtypes(include=[np.number]).columns.tolist()}")
-        
-        # 检查Volume列的数据类型
-        if 'Volume' in stock_data.columns:
-            volume_series = stock_data['Volume']
-            if hasattr(volume_series, 'dtype'):
-                print(f"Volume列是否都是整数: {volume_series.dtype}")
-            else:
-                print(f"Volume列数据类型: {type(volume_series)}")
-        else:
-            print("Volume列不存在")
+        stock_data = self._coerce_dtypes(stock_data)
         
-        print("\n修复后的数据类型:")
-        print(stock_data.dtypes)
+        # 验证数据格式是否正确，仅用于调试：python -O运行时__debug__为常量False，整段代码在编译时被移除
+        if __debug__ and self.verbose:
+            print("\n数据验证:")
+            print(f"索引类型: {type(stock_data.index)}")
+            print(f"索引前5个值: {stock_data.index[:5]}")
+            print(f"数值列是否都是数值类型: {stock_data.select_dtypes(include=[np.number]).columns.tolist()}")
+            print(f"Volume列是否都是整数: {stock_data['Volume'].dtype}")
         
         return stock_data
     
-    def create_bt_data_feed(self, stock_data, start_date=None, end_date=None):
+    def _coerce_dtypes(self, stock_data):
+        """
+        将价格列转换为price_dtype，成交量列转换为对应宽度的整数
+        
+        类型已符合时跳过转换，避免复制整列数据；
+        float32精度下成交量超出int32范围时保留int64
+        
+        参数：
+        - stock_data: 股票数据
+        
+        返回：
+        - pandas.DataFrame: 转换后的股票数据
+        """
+        volume_dtype = np.dtype(np.int64)
+        if self.price_dtype == np.float32 and stock_data['Volume'].max() <= np.iinfo(np.int32).max:
+            volume_dtype = np.dtype(np.int32)
+        if stock_data['Volume'].dtype != volume_dtype:
+            stock_data['Volume'] = stock_data['Volume'].astype(volume_dtype)
+        
+        price_columns = ['Open', 'High', 'Low', 'Close']
+        if (stock_data.dtypes[price_columns] != self.price_dtype).any():
+            stock_data[price_columns] = stock_data[price_columns].astype(self.price_dtype)
+        
+        return stock_data
+    
+    def create_bt_data_feed(self, stock_data, start_date=None, end_date=None, rsi_period=None):
         """
         创建Backtrader数据源
         
@@ -142,29 +435,61 @@ class DataLoader:
         - stock_data: pandas DataFrame格式的股票数据
         - start_date: 开始日期，可选
         - end_date: 结束日期，可选
+        - rsi_period: 预计算RSI列的周期，可选；指定时返回附带rsi数据线的RSIPandasData
         
         返回：
-        - bt.feeds.PandasData: Backtrader数据源对象
+        - FastPandasData: Backtrader数据源对象
         """
+        feed_class = FastPandasData
+        feed_kwargs = {}
+        if rsi_period is not None:
+            # 在完整收盘价序列上一次性计算RSI，作为额外的数据列
+            stock_data = stock_data.assign(rsi=indicators.rsi_sma_fast(stock_data['Close'].to_numpy(), rsi_period))
+            feed_class = RSIPandasData
+            feed_kwargs['rsi_period'] = rsi_period
+        
         if start_date and end_date:
-            return bt.feeds.PandasData(
+            return feed_class(
                 dataname=stock_data,
-                fromdate=datetime.strptime(start_date, '%Y-%m-%d'),
-                todate=datetime.strptime(end_date, '%Y-%m-%d')
+                fromdate=_parse_date(start_date),
+                todate=_parse_date(end_date),
+                **feed_kwargs
             )
         else:
-            return bt.feeds.PandasData(dataname=stock_data)
+            return feed_class(dataname=stock_data, **feed_kwargs)
+    
+    def save_data(self, stock_data, filename):
+        """
+        保存数据到文件，按扩展名选择格式
+        
+        - .parquet/.pq: Parquet(zstd压缩)，需要pyarrow
+        - .feather: Feather，需要pyarrow；日期索引保存为普通列
+        - 其他: CSV
+        
+        参数：
+        - stock_data: 股票数据
+        - filename: 文件名
+        """
+        ext = pathlib.Path(filename).suffix.lower()
+        if ext in ('.parquet', '.pq'):
+            stock_data.to_parquet(filename, engine='pyarrow', compression='zstd')
+        elif ext == '.feather':
+            # Feather只支持默认的整数索引
+            stock_data.reset_index().to_feather(filename)
+        else:
+            stock_data.to_csv(filename)
+        if self.verbose:
+            print(f"数据已保存到: {filename}")
     
     def save_data_to_csv(self, stock_data, filename):
         """
-        保存数据到CSV文件
+        保存数据到文件，保留的旧接口，等同于save_data
         
         参数：
         - stock_data: 股票数据
         - filename: 文件名
         """
-        stock_data.to_csv(filename)
-        print(f"数据已保存到: {filename}")
+        self.save_data(stock_data, filename)
     
     def get_data_info(self, stock_data):
         """
@@ -176,18 +501,28 @@ class DataLoader:
         返回：
         - dict: 数据信息字典
         """
+        # 价格列组成一个二维数组，按列一次求出最小值和最大值(与pandas一样忽略NaN)
+        price_columns = ['Open', 'High', 'Low', 'Close']
+        prices = stock_data[price_columns].to_numpy(dtype=np.float64)
+        mins = np.nanmin(prices, axis=0).tolist()
+        maxs = np.nanmax(prices, axis=0).tolist()
+        
+        # 浮点列走NumPy快速路径，其余列(object、datetime、可空扩展类型等)用isna统计缺失值
+        float_columns = [col for col, dtype in stock_data.dtypes.items()
+                         if isinstance(dtype, np.dtype) and dtype.kind == 'f']
+        float_data = stock_data[float_columns]
+        other_data = stock_data.drop(columns=float_columns)
+        missing = dict(zip(float_data.columns, np.isnan(float_data.to_numpy()).sum(axis=0).tolist()))
+        missing.update({col: int(count) for col, count in other_data.isna().sum().items()})
+        missing = {col: missing[col] for col in stock_data.columns}
+        
         info = {
             '数据行数': len(stock_data),
             '开始日期': stock_data.index[0].strftime('%Y-%m-%d'),
             '结束日期': stock_data.index[-1].strftime('%Y-%m-%d'),
             '数据列': list(stock_data.columns),
             '数据类型': stock_data.dtypes.to_dict(),
-            '缺失值': stock_data.isnull().sum().to_dict(),
-            '价格范围': {
-                'Open': (stock_data['Open'].min(), stock_data['Open'].max()),
-                'High': (stock_data['High'].min(), stock_data['High'].max()),
-                'Low': (stock_data['Low'].min(), stock_data['Low'].max()),
-                'Close': (stock_data['Close'].min(), stock_data['Close'].max()),
-            }
+            '缺失值': missing,
+            '价格范围': dict(zip(price_columns, zip(mins, maxs))),
         }
         return info
@@ -0,0 +1,408 @@
+"""
+技术指标计算
+
+在完整的收盘价数组上一次性计算技术指标，包括：
+- 简单移动平均线(SMA)
+- 布林带(Bollinger Bands)
+- MACD
+- RSI(SMA平滑)
+- 多个指标的融合计算(单次遍历)
+- 指标缓存，供多个策略和参数组合复用
+- 将预计算结果接入Backtrader的指标线
+- 数据未预加载时以相同的下标方式读取Backtrader指标线的当前值
+
+优先使用TA-Lib的C实现；未安装时SMA和布林带使用编译后的滑动求和内核(compute_all)，
+没有可用的编译内核时退化为pandas的滚动窗口实现
+(pandas-ta在没有TA-Lib时同样基于pandas滚动窗口计算，因此不单独作为一级回退)
+"""
+
+import math
+from array import array
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from quantics.strategy._njit import NUMBA_AVAILABLE, hotpath, jit_signatures, njit
+
+try:
+    import talib
+except ImportError:
+    talib = None
+
+# compute_all内核已编译(JIT或AOT)时才作为回退实现，纯Python执行的内核比pandas慢
+_COMPILED_KERNEL = NUMBA_AVAILABLE or hotpath is not None
+
+
+def sma_fast(close, period):
+    """
+    简单移动平均线
+
+    参数：
+    - close: 收盘价数组
+    - period: 均线周期
+
+    返回：
+    - numpy.ndarray: SMA数组，预热期为NaN
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if talib is not None:
+        return talib.SMA(close, timeperiod=period)
+    if _COMPILED_KERNEL:
+        return compute_all(close, [('sma', period)])[('sma', period)]
+    return pd.Series(close).rolling(period).mean().to_numpy()
+
+
+def bbands_fast(close, period, devfactor):
+    """
+    布林带
+
+    参数：
+    - close: 收盘价数组
+    - period: 布林带周期
+    - devfactor: 标准差倍数
+
+    返回：
+    - tuple: (上轨, 中轨, 下轨)，标准差按总体标准差计算，与Backtrader一致
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if talib is not None:
+        return talib.BBANDS(close, timeperiod=period, nbdevup=devfactor, nbdevdn=devfactor, matype=0)
+    if _COMPILED_KERNEL:
+        return compute_all(close, [('bbands', period, devfactor)])[('bbands', period, devfactor)]
+    rolling = pd.Series(close).rolling(period)
+    mid = rolling.mean().to_numpy()
+    std = rolling.std(ddof=0).to_numpy()
+    return mid + devfactor * std, mid, mid - devfactor * std
+
+
+def macd_fast(close, fastperiod, slowperiod, signalperiod):
+    """
+    MACD
+
+    参数：
+    - close: 收盘价数组
+    - fastperiod: 快线EMA周期
+    - slowperiod: 慢线EMA周期
+    - signalperiod: 信号线EMA周期
+
+    返回：
+    - tuple: (MACD线, 信号线)
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if talib is not None:
+        macd, signal, _ = talib.MACD(
+            close, fastperiod=fastperiod, slowperiod=slowperiod, signalperiod=signalperiod
+        )
+        return macd, signal
+    macd = _seeded_ema(close, fastperiod) - _seeded_ema(close, slowperiod)
+    return macd, _seeded_ema(macd, signalperiod)
+
+
+def rsi_sma_fast(close, period):
+    """
+    以简单移动平均平滑的RSI，与Backtrader的RSI_SMA一致
+
+    参数：
+    - close: 收盘价数组
+    - period: RSI周期
+
+    返回：
+    - numpy.ndarray: RSI数组，前period个bar为NaN
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    kernel = hotpath.rsi_sma if hotpath is not None else _rsi_sma
+    return kernel(np.require(close, np.float64, ['W']), period)
+
+
+@njit(jit_signatures('f8[:](f8[:], i8)'), cache=True, nogil=True)
+def _rsi_sma(close, period):
+    """
+    RSI内核
+
+    一次遍历收盘价，用滑动窗口维护上涨幅度和下跌幅度之和。
+    下跌幅度之和为0时RSI为100，上涨和下跌幅度之和均为0时为NaN。
+    """
+    n = len(close)
+    rsi = np.full(n, np.nan)
+    up_sum = 0.0
+    down_sum = 0.0
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        up_sum += max(delta, 0.0)
+        down_sum += max(-delta, 0.0)
+        if i > period:
+            old = close[i - period] - close[i - period - 1]
+            up_sum -= max(old, 0.0)
+            down_sum -= max(-old, 0.0)
+        if i >= period:
+            if down_sum > 0.0:
+                rsi[i] = 100.0 - 100.0 / (1.0 + up_sum / down_sum)
+            elif up_sum > 0.0:
+                rsi[i] = 100.0
+    return rsi
+
+
+def _seeded_ema(values, period):
+    """
+    以简单均值为初始值的指数移动平均，与Backtrader的EMA计算方式一致
+
+    参数：
+    - values: 输入数组，开头可以包含NaN
+    - period: EMA周期
+
+    返回：
+    - numpy.ndarray: EMA数组，预热期为NaN
+    """
+    values = np.array(values, dtype=np.float64)
+    start = int(np.argmax(~np.isnan(values)))
+    seed = start + period - 1
+    if seed >= len(values):
+        return np.full(len(values), np.nan)
+    values[seed] = values[start:seed + 1].mean()
+    values[:seed] = np.nan
+    return pd.Series(values).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+def compute_all(close, keys):
+    """
+    在一次遍历中计算多个指标(内核融合)
+
+    所有SMA、布林带和MACD在同一个循环中按bar推进，收盘价数组只读取一遍；RSI由单独的内核计算。
+    适合策略对比等需要同时计算大量指标的场景，结果可直接传入IndicatorCache。
+
+    参数：
+    - close: 收盘价数组
+    - keys: IndicatorCache缓存键列表，如[('sma', 20), ('bbands', 20, 2.0), ('macd', 12, 26, 9), ('rsi', 14)]
+
+    返回：
+    - dict: 缓存键 => 指标数组(多输出指标为数组元组)，预热期为NaN
+    """
+    keys = list(dict.fromkeys(keys))
+    for key in keys:
+        if key[0] not in ('sma', 'bbands', 'macd', 'rsi'):
+            raise ValueError(f"不支持的指标: {key}")
+    sma_keys = [key for key in keys if key[0] == 'sma']
+    bb_keys = [key for key in keys if key[0] == 'bbands']
+    macd_keys = [key for key in keys if key[0] == 'macd']
+
+    dtype = np.float32 if np.asarray(close).dtype == np.float32 else np.float64
+    kernel = _compute_all
+    if hotpath is not None:
+        kernel = hotpath.compute_all_f4 if dtype == np.float32 else hotpath.compute_all_f8
+    sma, bb, macd = kernel(
+        np.require(close, dtype, ['C', 'W']),
+        np.array([key[1] for key in sma_keys], dtype=np.int64),
+        np.array([key[1] for key in bb_keys], dtype=np.int64),
+        np.array([key[2] for key in bb_keys], dtype=np.float64),
+        np.array([key[1:] for key in macd_keys], dtype=np.int64).reshape(-1, 3),
+    )
+
+    result = {}
+    for j, key in enumerate(sma_keys):
+        result[key] = sma[j]
+    for j, key in enumerate(bb_keys):
+        result[key] = (bb[j, 0], bb[j, 1], bb[j, 2])
+    for j, key in enumerate(macd_keys):
+        result[key] = (macd[j, 0], macd[j, 1])
+    for key in keys:
+        if key[0] == 'rsi':
+            result[key] = rsi_sma_fast(close, key[1])
+    return result
+
+
+@njit(jit_signatures([
+    'Tuple((f8[:, :], f8[:, :, :], f8[:, :, :]))(f8[:], i8[:], i8[:], f8[:], i8[:, :])',
+    'Tuple((f8[:, :], f8[:, :, :], f8[:, :, :]))(f4[:], i8[:], i8[:], f8[:], i8[:, :])',
+]), cache=True, nogil=True)
+def _compute_all(close, sma_periods, bb_periods, bb_devs, macd_periods):
+    """
+    融合指标内核
+
+    收盘价可以是float32或float64，累加状态和输出均为float64。
+    SMA使用滑动窗口求和，布林带使用滑动窗口Welford方差，
+    MACD使用以简单均值为初始值的EMA递推，与Backtrader的计算方式一致。
+    滑动求和每个bar的开销与窗口长度无关，因此周期作为运行时参数传入，
+    不按具体周期值生成专用内核(专用内核没有可测的加速，每组周期还要额外编译一次)。
+
+    返回：
+    - tuple: (sma[k, n], bbands[k, 3, n], macd[k, 2, n])，布林带依次为上/中/下轨，MACD依次为MACD线/信号线
+    """
+    n = len(close)
+    n_sma = len(sma_periods)
+    n_bb = len(bb_periods)
+    n_macd = len(macd_periods)
+
+    sma = np.full((n_sma, n), np.nan)
+    bb = np.full((n_bb, 3, n), np.nan)
+    macd = np.full((n_macd, 2, n), np.nan)
+
+    sma_sum = np.zeros(n_sma)
+    bb_mean = np.zeros(n_bb)
+    bb_m2 = np.zeros(n_bb)
+    # MACD每组的状态：快线/慢线/信号线的EMA值，以及预热期的累加和
+    ema = np.zeros((n_macd, 3))
+    seed_sum = np.zeros((n_macd, 3))
+
+    for i in range(n):
+        x = close[i]
+
+        for k in range(n_sma):
+            period = sma_periods[k]
+            sma_sum[k] += x
+            if i >= period:
+                sma_sum[k] -= close[i - period]
+            if i >= period - 1:
+                sma[k, i] = sma_sum[k] / period
+
+        for k in range(n_bb):
+            period = bb_periods[k]
+            mean = bb_mean[k]
+            if i < period:
+                delta = x - mean
+                bb_mean[k] = mean + delta / (i + 1)
+                bb_m2[k] += delta * (x - bb_mean[k])
+            else:
+                old = close[i - period]
+                bb_mean[k] = mean + (x - old) / period
+                bb_m2[k] += (x - old) * (x - bb_mean[k] + old - mean)
+            if i >= period - 1:
+                std = math.sqrt(max(bb_m2[k], 0.0) / period)
+                bb[k, 0, i] = bb_mean[k] + bb_devs[k] * std
+                bb[k, 1, i] = bb_mean[k]
+                bb[k, 2, i] = bb_mean[k] - bb_devs[k] * std
+
+        for k in range(n_macd):
+            # 快线和慢线EMA
+            for j in range(2):
+                period = macd_periods[k, j]
+                if i < period:
+                    seed_sum[k, j] += x
+                    if i == period - 1:
+                        ema[k, j] = seed_sum[k, j] / period
+                else:
+                    alpha = 2.0 / (period + 1)
+                    ema[k, j] = ema[k, j] * (1.0 - alpha) + x * alpha
+
+            start = max(macd_periods[k, 0], macd_periods[k, 1]) - 1
+            if i < start:
+                continue
+            value = ema[k, 0] - ema[k, 1]
+            macd[k, 0, i] = value
+
+            # 信号线EMA，从MACD线第一个有效值开始预热
+            period = macd_periods[k, 2]
+            if i < start + period:
+                seed_sum[k, 2] += value
+                if i == start + period - 1:
+                    ema[k, 2] = seed_sum[k, 2] / period
+                    macd[k, 1, i] = ema[k, 2]
+            else:
+                alpha = 2.0 / (period + 1)
+                ema[k, 2] = ema[k, 2] * (1.0 - alpha) + value * alpha
+                macd[k, 1, i] = ema[k, 2]
+
+    return sma, bb, macd
+
+
+class IndicatorCache:
+    """
+    指标缓存
+
+    同一收盘价序列上的指标只计算一次，供多个策略和参数组合复用。
+    缓存键与compute_all、indicators_pl.compute_indicators的返回值一致：
+    - ('sma', period): SMA数组
+    - ('bbands', period, devfactor): (上轨, 中轨, 下轨)
+    - ('macd', fastperiod, slowperiod, signalperiod): (MACD线, 信号线)
+    - ('rsi', period): RSI数组
+    """
+
+    def __init__(self, close, precomputed=None):
+        """
+        初始化指标缓存
+
+        参数：
+        - close: 收盘价数组
+        - precomputed: 预先批量计算好的指标字典，可选
+        """
+        self.close = close
+        self._cache = dict(precomputed or {})
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def update(self, precomputed):
+        """合并批量计算好的指标，如indicators_pl.compute_indicators的返回值"""
+        self._cache.update(precomputed)
+
+    def _get(self, key, func, *args):
+        if key not in self._cache:
+            self._cache[key] = func(self.close, *args)
+        return self._cache[key]
+
+    def sma(self, period):
+        """SMA，参数同sma_fast"""
+        return self._get(('sma', period), sma_fast, period)
+
+    def bbands(self, period, devfactor):
+        """布林带，参数同bbands_fast"""
+        return self._get(('bbands', period, devfactor), bbands_fast, period, devfactor)
+
+    def macd(self, fastperiod, slowperiod, signalperiod):
+        """MACD，参数同macd_fast"""
+        return self._get(('macd', fastperiod, slowperiod, signalperiod), macd_fast,
+                         fastperiod, slowperiod, signalperiod)
+
+    def rsi(self, period):
+        """RSI，参数同rsi_sma_fast"""
+        return self._get(('rsi', period), rsi_sma_fast, period)
+
+
+class PrecomputedLine(bt.Indicator):
+    """
+    预计算指标线
+
+    将一次性计算好的NumPy数组接入Backtrader，使策略的最小周期和绘图与原生指标一致。
+    runonce模式下整段内存复制，不再逐bar计算。
+
+    参数：
+    - values: 与数据源等长的预计算数组
+    - period: 指标的最小周期
+    """
+
+    lines = ('value',)
+    params = (
+        ('values', None),
+        ('period', 1),
+    )
+    plotinfo = dict(subplot=False)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+
+    def next(self):
+        self.lines.value[0] = self.p.values[len(self) - 1]
+
+    def once(self, start, end):
+        values = np.ascontiguousarray(self.p.values[start:end], dtype=np.float64)
+        self.lines.value.array[start:end] = array('d', values.tobytes())
+
+
+class LiveValues:
+    """
+    逐bar计算的指标线的数组式读取接口
+
+    数据未预加载(如实时数据源或exactbars)时无法预计算指标，策略改用Backtrader原生指标逐bar计算。
+    本类使next()中values[i]的写法保持不变：i总是当前bar的索引，直接返回指标线的当前值line[0]
+
+    参数：
+    - line: Backtrader指标线
+    """
+
+    __slots__ = ('line',)
+
+    def __init__(self, line):
+        self.line = line
+
+    def __getitem__(self, i):
+        return self.line[0]
@@ -0,0 +1,133 @@
+"""
+基于Polars的批量指标计算
+
+将多个指标组织为一条Polars惰性查询，由查询优化器合并对收盘价的多次扫描，包括：
+- 简单移动平均线(SMA)
+- 布林带(Bollinger Bands)
+- MACD
+- RSI(SMA平滑)
+
+结果为NumPy数组字典，可直接传入IndicatorCache供向量化回测使用。
+未安装Polars时逐个调用indicators模块中的函数计算。
+"""
+
+import numpy as np
+
+from quantics.strategy import indicators
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+def compute_indicators(stock_data, keys):
+    """
+    批量计算指标
+
+    参数：
+    - stock_data: pandas或polars DataFrame格式的股票数据(列名大小写均可)，
+      或vector_engine.to_arrays生成的数组字典
+    - keys: IndicatorCache缓存键列表，如[('sma', 20), ('bbands', 20, 2.0), ('macd', 12, 26, 9), ('rsi', 14)]
+
+    返回：
+    - dict: 缓存键 => 指标数组(多输出指标为数组元组)，预热期为NaN
+    """
+    keys = list(dict.fromkeys(keys))
+    if pl is None:
+        return _compute_with_pandas(stock_data, keys)
+
+    if isinstance(stock_data, dict):
+        lf = pl.LazyFrame({'close': stock_data['close']})
+    elif isinstance(stock_data, pl.DataFrame):
+        close_name = next(col for col in stock_data.columns if col.lower() == 'close')
+        lf = stock_data.lazy().select(pl.col(close_name).cast(pl.Float64).alias('close'))
+    else:
+        close_name = next(col for col in stock_data.columns if str(col).lower() == 'close')
+        lf = pl.LazyFrame({'close': stock_data[close_name].to_numpy(dtype=np.float64)})
+
+    close = pl.col('close')
+    exprs = []
+    for key in keys:
+        name = '_'.join(str(part) for part in key)
+        kind = key[0]
+        if kind == 'sma':
+            exprs.append(close.rolling_mean(key[1]).alias(name))
+        elif kind == 'bbands':
+            _, period, devfactor = key
+            mid = close.rolling_mean(period)
+            std = close.rolling_std(period, ddof=0)
+            exprs += [
+                (mid + devfactor * std).alias(name + '_top'),
+                mid.alias(name + '_mid'),
+                (mid - devfactor * std).alias(name + '_bot'),
+            ]
+        elif kind == 'macd':
+            _, fastperiod, slowperiod, signalperiod = key
+            macd = _seeded_ema(close, fastperiod, 0) - _seeded_ema(close, slowperiod, 0)
+            exprs += [
+                macd.alias(name + '_macd'),
+                _seeded_ema(macd, signalperiod, max(fastperiod, slowperiod) - 1).alias(name + '_signal'),
+            ]
+        elif kind == 'rsi':
+            period = key[1]
+            delta = close.diff()
+            up = delta.clip(lower_bound=0.0).rolling_mean(period)
+            down = (-delta).clip(lower_bound=0.0).rolling_mean(period)
+            exprs.append((100.0 - 100.0 / (1.0 + up / down)).alias(name))
+        else:
+            raise ValueError(f"不支持的指标: {key}")
+
+    # 空值填充为NaN后没有有效性掩码，to_numpy可以零拷贝返回Arrow缓冲区的视图
+    df = lf.select([expr.fill_null(np.nan) for expr in exprs]).collect()
+
+    result = {}
+    for key in keys:
+        name = '_'.join(str(part) for part in key)
+        if key[0] in ('sma', 'rsi'):
+            result[key] = df[name].to_numpy()
+        elif key[0] == 'bbands':
+            result[key] = tuple(df[f'{name}_{part}'].to_numpy() for part in ('top', 'mid', 'bot'))
+        else:
+            result[key] = (df[name + '_macd'].to_numpy(), df[name + '_signal'].to_numpy())
+    return result
+
+
+def _seeded_ema(expr, period, start):
+    """
+    以简单均值为初始值的指数移动平均表达式，与indicators.macd_fast的计算方式一致
+
+    参数：
+    - expr: 输入列表达式
+    - period: EMA周期
+    - start: 输入的第一个有效值位置
+    """
+    seed = start + period - 1
+    index = pl.int_range(pl.len())
+    seeded = (
+        pl.when(index < seed).then(None)
+        .when(index == seed).then(expr.rolling_mean(period))
+        .otherwise(expr)
+    )
+    return seeded.ewm_mean(span=period, adjust=False, ignore_nulls=True)
+
+
+def _compute_with_pandas(stock_data, keys):
+    """未安装Polars时逐个计算指标"""
+    if isinstance(stock_data, dict):
+        close = stock_data['close']
+    else:
+        close_name = next(col for col in stock_data.columns if str(col).lower() == 'close')
+        close = np.asarray(stock_data[close_name], dtype=np.float64)
+    funcs = {
+        'sma': indicators.sma_fast,
+        'bbands': indicators.bbands_fast,
+        'macd': indicators.macd_fast,
+        'rsi': indicators.rsi_sma_fast,
+    }
+    result = {}
+    for key in keys:
+        if key[0] not in funcs:
+            raise ValueError(f"不支持的指标: {key}")
+        result[key] = funcs[key[0]](close, *key[1:])
+    return result
@@ -7,6 +7,7 @@ MACD策略
 """
 
 import backtrader as bt
+from quantics.strategy import indicators, vector_engine
 from quantics.strategy.base_strategy import BaseStrategy
 
 
@@ -41,32 +42,52 @@ class MACDStrategy(BaseStrategy):
         
         初始化内容:
         - order: 订单对象，用于跟踪当前订单状态
-        - macd_ind: MACD指标对象，包含MACD线、信号线和柱状图
-        - macd_crossover: 交叉信号指标，用于检测MACD线与信号线的交叉
+        - macd/signal: 预计算的MACD线和信号线
+        - macd_crossover: 预计算的交叉信号数组，用于检测MACD线与信号线的交叉
         
         执行时机：策略开始前，只执行一次
         """
         # 订单状态跟踪变量，用于防止重复下单
         self.order = None
         
-        # 创建MACD指标对象
-        # MACD指标包含三条线：
+        # 绑定收盘价线，避免next()中逐bar经过datas[0]的属性查找
+        self._close_buf = self.datas[0].close
+        
+        close = self._close_values()
+        if close is None:
+            # 数据未预加载，使用Backtrader原生指标逐bar计算
+            macd_ind = bt.indicators.MACD(
+                self.datas[0].close,
+                period_me1=self.p.fastperiod,
+                period_me2=self.p.slowperiod,
+                period_signal=self.p.signalperiod
+            )
+            self.macd, self.signal = macd_ind.macd, macd_ind.signal
+            self.macd_crossover = indicators.LiveValues(bt.indicators.CrossOver(self.macd, self.signal))
+            return
+        
+        # 在完整收盘价数组上一次性计算MACD
         # 1. MACD线 = 快线EMA - 慢线EMA (反映价格趋势)
         # 2. 信号线 = MACD线的移动平均线 (平滑MACD线)
-        # 3. 柱状图 = MACD线 - 信号线 (反映趋势强度)
-        self.macd_ind = bt.indicators.MACD(
-            self.datas[0].close,           # 使用收盘价计算
-            period_me1=self.p.fastperiod,  # 快线周期 (12天)
-            period_me2=self.p.slowperiod,  # 慢线周期 (26天)
-            period_signal=self.p.signalperiod  # 信号线周期 (9天)
+        macd, signal = indicators.macd_fast(
+            close,
+            self.p.fastperiod,    # 快线周期 (12天)
+            self.p.slowperiod,    # 慢线周期 (26天)
+            self.p.signalperiod   # 信号线周期 (9天)
         )
         
-        # 创建交叉信号指标
+        # 接入Backtrader指标线，用于确定最小周期和绘图
+        self.macd = indicators.PrecomputedLine(values=macd, period=self.p.slowperiod)
+        self.signal = indicators.PrecomputedLine(
+            values=signal, period=self.p.slowperiod + self.p.signalperiod - 1
+        )
+        
+        # 预计算交叉信号
         # 用于检测MACD线与信号线的交叉情况：
         # >0: MACD线上穿信号线（买入信号，趋势向上）
         # <0: MACD线下穿信号线（卖出信号，趋势向下）
         # =0: 无交叉
-        self.macd_crossover = bt.indicators.CrossOver(self.macd_ind.macd, self.macd_ind.signal)
+        self.macd_crossover = vector_engine.cross_signals(macd, signal)
     
     def next(self):
         """
@@ -87,16 +108,17 @@ class MACDStrategy(BaseStrategy):
         if self.order:
             return
         
+        position = self.position
+        crossover = self.macd_crossover[len(self) - 1]
+        
         # 当前无持仓，检查买入信号
-        if not self.position:
+        if not position:
             # MACD线上穿信号线，产生买入信号
-            if self.macd_crossover > 0:
-                # 获取当前可用现金
-                cash = self.broker.getcash()
-                # 获取当前收盘价
-                price = self.datas[0].close[0]
+            if crossover > 0:
+                # 当前收盘价
+                price = self._close_buf[0]
                 # 计算可买入的股数（整股），使用99%的资金以避免保证金问题
-                size = int((cash * 0.99) // price)
+                size = int(self.broker.getcash() * self.cash_ratio // price)
                 
                 # 确保有足够的资金买入至少1股
                 if size > 0:
@@ -106,7 +128,22 @@ class MACDStrategy(BaseStrategy):
         else:
             # 当前有持仓，检查卖出信号
             # MACD线下穿信号线，产生卖出信号
-            if self.macd_crossover < 0:
-                self.log(f'卖出信号 (MACD<Signal), 卖出全部: {self.position.size} 股')
+            if crossover < 0:
+                self.log(f'卖出信号 (MACD<Signal), 卖出全部: {position.size} 股')
                 # 创建卖出订单，卖出全部持仓
-                self.order = self.sell(size=self.position.size)
+                self.order = self.sell(size=position.size)
+    
+    @classmethod
+    def vector_indicators(cls, p):
+        return [('macd', p.fastperiod, p.slowperiod, p.signalperiod)]
+    
+    @classmethod
+    def vector_signals(cls, ind, p):
+        """
+        向量化信号生成
+        
+        一次性计算MACD线和信号线：MACD线上穿信号线为买入信号，下穿为卖出信号
+        """
+        macd, signal = ind.macd(p.fastperiod, p.slowperiod, p.signalperiod)
+        return vector_engine.cross_signals(macd, signal)
+
@@ -7,6 +7,7 @@
 """
 
 import backtrader as bt
+from quantics.strategy import indicators, vector_engine
 from quantics.strategy.base_strategy import BaseStrategy
 
 
@@ -27,6 +28,9 @@ class MovingAverageCrossStrategy(BaseStrategy):
         ('printlog', True),     # 是否打印交易日志
     )
     
+    # 使用95%的资金买入
+    cash_ratio = 0.95
+    
     def __init__(self):
         """
         策略初始化函数
@@ -41,40 +45,45 @@ class MovingAverageCrossStrategy(BaseStrategy):
         # 订单状态跟踪变量，用于防止重复下单
         self.order = None
         
-        # 创建短期移动平均线指标
-        self.fast_ma = bt.indicators.SimpleMovingAverage(
-            self.datas[0].close, period=self.params.fast_period
-        )
+        # 绑定收盘价线，避免next()中逐bar经过datas[0]的属性查找
+        self._close_buf = self.datas[0].close
+        
+        close = self._close_values()
+        if close is None:
+            # 数据未预加载，使用Backtrader原生指标逐bar计算
+            self.fast_ma = bt.indicators.SimpleMovingAverage(self.datas[0].close, period=self.params.fast_period)
+            self.slow_ma = bt.indicators.SimpleMovingAverage(self.datas[0].close, period=self.params.slow_period)
+            self._crossover_arr = indicators.LiveValues(bt.indicators.CrossOver(self.fast_ma, self.slow_ma))
+            return
+        
+        # 在完整收盘价数组上一次性计算快慢均线
+        fast = indicators.sma_fast(close, self.params.fast_period)
+        slow = indicators.sma_fast(close, self.params.slow_period)
         
-        # 创建长期移动平均线指标
-        self.slow_ma = bt.indicators.SimpleMovingAverage(
-            self.datas[0].close, period=self.params.slow_period
-        )
+        # 接入Backtrader指标线，用于确定最小周期和绘图
+        # 策略的最小周期取指标线中的最大值(slow_period)，不足时Backtrader调用prenext()而非next()
+        self.fast_ma = indicators.PrecomputedLine(values=fast, period=self.params.fast_period)
+        self.slow_ma = indicators.PrecomputedLine(values=slow, period=self.params.slow_period)
         
-        # 创建交叉信号指标
+        # 预计算交叉信号
         # >0: 快线上穿慢线（买入信号）
         # <0: 快线下穿慢线（卖出信号）
         # =0: 无交叉
-        self.crossover = bt.indicators.CrossOver(self.fast_ma, self.slow_ma)
+        self._crossover_arr = vector_engine.cross_signals(fast, slow)
     
     def next(self):
-        # 确保有足够的数据
-        if len(self) < self.params.slow_period:
-            return
-        
         # 如果有未完成的订单，不进行新的交易
         if self.order:
             return
         
-        # 获取当前持仓
-        position = self.getposition()
+        # 获取当前持仓和交叉信号
+        position = self.position
+        crossover = self._crossover_arr[len(self) - 1]
         
         # 当前无持仓，检查买入信号
         if not position.size:
-            if self.crossover > 0:  # 快线上穿慢线
-                cash = self.broker.getcash()
-                price = self.datas[0].close[0]
-                size = int(cash * 0.95 // price)
+            if crossover > 0:  # 快线上穿慢线
+                size = int(self.broker.getcash() * self.cash_ratio // self._close_buf[0])
                 
                 if size > 0:
                     self.log(f'买入信号 (fast_ma>slow_ma), 计划买入: {size} 股')
@@ -82,6 +91,19 @@ class MovingAverageCrossStrategy(BaseStrategy):
         
         # 当前有持仓，检查卖出信号
         else:
-            if self.crossover < 0:  # 快线下穿慢线
+            if crossover < 0:  # 快线下穿慢线
                 self.log(f'卖出信号 (fast_ma<slow_ma), 卖出全部: {position.size} 股')
                 self.order = self.sell(size=position.size)
+    
+    @classmethod
+    def vector_indicators(cls, p):
+        return [('sma', p.fast_period), ('sma', p.slow_period)]
+    
+    @classmethod
+    def vector_signals(cls, ind, p):
+        """
+        向量化信号生成
+        
+        一次性计算快慢均线并检测交叉：快线上穿慢线为买入信号，下穿为卖出信号
+        """
+        return vector_engine.cross_signals(ind.sma(p.fast_period), ind.sma(p.slow_period))
@@ -7,6 +7,8 @@ RSI策略
 """
 
 import backtrader as bt
+import numpy as np
+from quantics.strategy import indicators, vector_engine
 from quantics.strategy.base_strategy import BaseStrategy
 
 
@@ -38,38 +40,105 @@ class RSIStrategy(BaseStrategy):
         
         初始化内容:
         - order: 订单对象，用于跟踪当前订单状态
-        - rsi: RSI指标对象，基于SMA计算的相对强弱指数
+        - rsi: 预计算的RSI指标线，基于SMA计算的相对强弱指数
         """
         self.order = None
-        self.rsi = bt.indicators.RSI_SMA(self.datas[0], period=self.params.rsi_period)
+        
+        # 绑定日志开关，避免next()中逐bar经过params的属性查找
+        self._printlog = self.params.printlog
+        
+        data = self.datas[0]
+        period = self.params.rsi_period
+        close = self._close_values()
+        if close is None:
+            # 数据未预加载，使用Backtrader原生指标逐bar计算，信号线与_precompute_signals的条件一致
+            self.rsi = bt.indicators.RSI_SMA(data, period=period)
+            self._rsi_arr = indicators.LiveValues(self.rsi)
+            self._signal_arr = indicators.LiveValues(
+                bt.If(self.rsi < self.params.rsi_low, 1, bt.If(self.rsi > self.params.rsi_high, -1, 0))
+            )
+            return
+        
+        # 数据源附带相同周期的RSI列时直接使用，否则在完整收盘价数组上一次性计算
+        if 'rsi' in data.getlinealiases() and getattr(data.p, 'rsi_period', None) == period:
+            rsi = np.array(data.lines.rsi.array, dtype=np.float64)
+        else:
+            rsi = indicators.rsi_sma_fast(close, period)
+        
+        # 接入Backtrader指标线，最小周期与RSI_SMA一致
+        self.rsi = indicators.PrecomputedLine(values=rsi, period=period + 1)
+        
+        # 预计算买卖信号，next()中只需按bar索引查表
+        # 1: RSI低于超卖阈值（买入信号）
+        # -1: RSI高于超买阈值（卖出信号）
+        # 0: 无信号
+        self._rsi_arr = rsi
+        self._signal_arr = vector_engine.level_signals(
+            *self._precompute_signals(rsi, self.params.rsi_low, self.params.rsi_high)
+        )
+    
+    @staticmethod
+    def _precompute_signals(rsi, low, high):
+        """
+        一次性计算RSI的买卖条件
+        
+        参数：
+        - rsi: RSI数组，预热期为NaN
+        - low: 超卖阈值
+        - high: 超买阈值
+        
+        返回：
+        - tuple: (buy_mask, sell_mask)布尔数组，NaN处均为False
+        """
+        return rsi < low, rsi > high
     
     def next(self):
         """
         策略核心逻辑函数
         
         在每个交易周期被调用，实现主要的交易决策逻辑:
-        1. 获取当前价格和RSI值
+        1. 读取当前bar的预计算信号
         2. 检查是否有待处理订单
-        3. 根据持仓状态和RSI值决定买入或卖出
+        3. 根据持仓状态和信号决定买入或卖出
         """
-        price = self.datas[0].close[0]
-        rsi_value = self.rsi[0]
-        self.log(f'收盘价: {price:.2f}, RSI: {rsi_value:.2f}')
+        i = len(self) - 1
+        # nextstart中绑定的收盘价数组
+        close = self._close_arr[i]
+        # 每个bar都会记录，关闭日志时跳过字符串格式化
+        if self._printlog:
+            self.log(f'收盘价: {close:.2f}, RSI: {self._rsi_arr[i]:.2f}')
         
         if self.order:
             return
         
+        position = self.position
+        signal = self._signal_arr[i]
+        
         # 若无持仓，且 RSI < 30 => 全仓买入
-        if not self.position:
-            if rsi_value < self.params.rsi_low:
-                cash = self.broker.getcash()
-                # 使用99%的资金买入，避免保证金不足的问题
-                size = int((cash * 0.99) // price)
+        if not position.size:
+            if signal > 0:
+                # 按cash_ratio比例的资金买入，避免保证金不足的问题
+                size = int(self.broker.getcash() * self.cash_ratio // close)
                 if size > 0:
                     self.log(f'买入信号 (RSI<{self.params.rsi_low}), 全仓买入: {size} 股')
                     self.order = self.buy(size=size)
         else:
             # 有持仓时，若 RSI > 70 => 卖出全部
-            if rsi_value > self.params.rsi_high:
-                self.log(f'卖出信号 (RSI>{self.params.rsi_high}), 卖出全部: {self.position.size} 股')
-                self.order = self.sell(size=self.position.size)
+            if signal < 0:
+                self.log(f'卖出信号 (RSI>{self.params.rsi_high}), 卖出全部: {position.size} 股')
+                self.order = self.sell(size=position.size)
+    
+    @classmethod
+    def vector_indicators(cls, p):
+        return [('rsi', p.rsi_period)]
+    
+    @classmethod
+    def vector_signals(cls, ind, p):
+        """
+        向量化信号生成
+        
+        一次性计算RSI：RSI低于超卖阈值为买入信号，高于超买阈值为卖出信号
+        """
+        return vector_engine.level_signals(
+            *cls._precompute_signals(ind.rsi(p.rsi_period), p.rsi_low, p.rsi_high)
+        )
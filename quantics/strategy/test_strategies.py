@@ -4,12 +4,15 @@
 验证拆分后的策略是否能正常工作
 """
 
+import functools
 import sys
+import time
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # 导入策略
 from strategy import (
+    BaseStrategy,
     MovingAverageCrossStrategy,
     RSIStrategy,
     BollingerBandsStrategy,
@@ -19,47 +22,101 @@ from strategy import (
     BacktestUtils
 )
 
+import backtrader as bt
 import pandas as pd
 import numpy as np
 
+# 各测试共用同一个数据加载器
+_DATA_LOADER = DataLoader()
 
-def test_data_loader():
-    """测试数据加载器"""
-    print("=== 测试数据加载器 ===")
+
+class _LegacyMovingAverageCrossStrategy(MovingAverageCrossStrategy):
+    """不提供向量化信号的均线策略，用于测试Backtrader回测的进程池路径"""
     
-    data_loader = DataLoader()
+    vector_signals = classmethod(BaseStrategy.vector_signals.__func__)
+
+
+class _SlowStrategy(bt.Strategy):
+    """每根K线休眠的策略，用于测试进程池超时"""
     
-    # 创建模拟数据
+    def next(self):
+        time.sleep(1)
+
+
+@functools.lru_cache(maxsize=1)
+def _build_mock_data():
+    """生成并验证模拟股票数据，整个测试过程只执行一次"""
     dates = pd.date_range('2022-01-01', '2022-12-31', freq='D')
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
+    n = len(dates)
     
-    # 生成模拟股票数据
+    # 生成模拟股票数据：收盘价为日收益率的累积乘积，第一天为基准价格
     base_price = 100
-    returns = np.random.normal(0, 0.02, len(dates))
-    prices = [base_price]
-    
-    for ret in returns[1:]:
-        prices.append(prices[-1] * (1 + ret))
+    returns = rng.normal(0, 0.02, n)
+    returns[0] = 0.0
+    prices = base_price * np.cumprod(1 + returns)
     
     # 创建OHLCV数据
     data = {
-        'Open': [p * (1 + np.random.normal(0, 0.01)) for p in prices],
-        'High': [p * (1 + abs(np.random.normal(0, 0.02))) for p in prices],
-        'Low': [p * (1 - abs(np.random.normal(0, 0.02))) for p in prices],
+        'Open': prices * (1 + rng.normal(0, 0.01, n)),
+        'High': prices * (1 + np.abs(rng.normal(0, 0.02, n))),
+        'Low': prices * (1 - np.abs(rng.normal(0, 0.02, n))),
         'Close': prices,
-        'Volume': np.random.randint(1000000, 10000000, len(dates))
+        'Volume': rng.integers(1000000, 10000000, n)
     }
     
     stock_data = pd.DataFrame(data, index=dates)
+    return _DATA_LOADER._validate_and_fix_data(stock_data)
+
+
+def _make_mock_data():
+    """
+    获取模拟股票数据
+    
+    返回：
+    - pandas.DataFrame: 模拟数据的副本，各测试可以自由修改
+    """
+    return _build_mock_data().copy()
+
+
+def test_data_loader():
+    """测试数据加载器"""
+    print("=== 测试数据加载器 ===")
     
     # 测试数据验证
-    fixed_data = data_loader._validate_and_fix_data(stock_data)
+    fixed_data = _make_mock_data()
+    assert fixed_data.shape == (365, 5)
+    assert list(fixed_data.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert (fixed_data.dtypes[['Open', 'High', 'Low', 'Close']] == np.float64).all()
+    assert fixed_data['Volume'].dtype == np.int64
+    
+    # 单行表头(旧版yfinance、DataFrame.to_csv)和3行表头(新版yfinance)的CSV缓存都完整读取
+    import tempfile
+    loader = DataLoader(cache_dir=tempfile.mkdtemp())
+    cache_name = loader._cache_name('TEST', '2022-01-01', '2022-12-31')
+    fixed_data.rename_axis('Date').to_csv(cache_name + '.csv')
+    single_header = loader._load_cached('TEST', '2022-01-01', '2022-12-31')
+    frame = fixed_data[['Close', 'High', 'Low', 'Open', 'Volume']]
+    frame.columns = pd.MultiIndex.from_product([frame.columns, ['TEST']], names=['Price', 'Ticker'])
+    frame.rename_axis('Date').to_csv(cache_name + '.csv')
+    yfinance_header = loader._load_cached('TEST', '2022-01-01', '2022-12-31')
+    for loaded in (single_header, yfinance_header):
+        assert len(loaded) == len(fixed_data) and loaded.index[0] == fixed_data.index[0]
+        assert np.allclose(loaded.to_numpy(), fixed_data.to_numpy())
+    
+    # 非浮点列(object、datetime、可空扩展类型)的缺失值也要统计
+    mixed = fixed_data.head(4).copy()
+    mixed['Open'] = [1.0, np.nan, 3.0, 4.0]
+    mixed['Close'] = pd.array([1.0, None, 3.0, 4.0], dtype='Float64')
+    mixed['Volume'] = pd.array([1, None, 3, 4], dtype='Int64')
+    mixed['Note'] = ['a', None, 'b', 'c']
+    mixed['Date'] = pd.to_datetime(['2022-01-01', None, '2022-01-03', '2022-01-04'])
+    missing = loader.get_data_info(mixed)['缺失值']
+    assert missing == {'Open': 1, 'High': 0, 'Low': 0, 'Close': 1, 'Volume': 1, 'Note': 1, 'Date': 1}
     
     print("数据加载器测试通过")
     print(f"数据形状: {fixed_data.shape}")
     print(f"数据类型: {fixed_data.dtypes}")
-    
-    return fixed_data
 
 
 def test_strategies():
@@ -67,7 +124,7 @@ def test_strategies():
     print("\n=== 测试策略类 ===")
     
     # 创建模拟数据
-    stock_data = test_data_loader()
+    stock_data = _make_mock_data()
     
     # 测试每个策略类
     strategies = [
@@ -103,11 +160,10 @@ def test_backtest_utils():
     print("\n=== 测试回测工具 ===")
     
     # 创建模拟数据
-    stock_data = test_data_loader()
+    stock_data = _make_mock_data()
     
     # 创建数据源
-    data_loader = DataLoader()
-    data_feed = data_loader.create_bt_data_feed(stock_data)
+    data_feed = _DATA_LOADER.create_bt_data_feed(stock_data)
     
     # 测试回测工具
     backtest_utils = BacktestUtils(initial_cash=100000.0, commission=0.001)
@@ -140,9 +196,233 @@ def test_backtest_utils():
     except Exception as e:
         print(f"  ✗ 策略比较失败: {e}")
     
+    # 测试参数优化：向量化回测和进程池两条路径，约束过滤掉fast_period=20, slow_period=20的组合
+    print("测试参数优化...")
+    param_ranges = {
+        'fast_period': [5, 20],
+        'slow_period': [20, 30],
+    }
+    expected = {
+        (fast, slow): backtest_utils.run_strategy_and_get_metrics(
+            MovingAverageCrossStrategy, data_feed, fast_period=fast, slow_period=slow
+        )['sharpe_ratio']
+        for fast, slow in [(5, 20), (5, 30), (20, 30)]
+    }
+    best = max(expected, key=expected.get)
+    for strategy_class in (MovingAverageCrossStrategy, _LegacyMovingAverageCrossStrategy):
+        optimization_df = backtest_utils.optimize_parameters(
+            strategy_class,
+            data_feed,
+            param_ranges,
+            processes=2,
+            constraint=lambda p: p['fast_period'] < p['slow_period']
+        )
+        assert len(optimization_df) == 3, optimization_df
+        top = optimization_df.iloc[0]
+        assert (top['fast_period'], top['slow_period']) == best, (top, best)
+        assert np.isclose(top['sharpe_ratio'], expected[best])
+        print(f"  ✓ {strategy_class.__name__} 参数优化通过, 最佳参数: {best}")
+    
+    # 向量化参数优化运行过并行内核之后，策略比较中Backtrader回测的进程池仍可正常使用；
+    # 参数错误的策略记为NaN，不影响其他策略
+    print("测试并行内核之后的策略比较...")
+    strategy_configs = [
+        ('MA vectorized', MovingAverageCrossStrategy, dict(fast_period=5, slow_period=30)),
+        ('MA legacy', _LegacyMovingAverageCrossStrategy, dict(fast_period=5, slow_period=30, printlog=False)),
+        ('MA legacy 2', _LegacyMovingAverageCrossStrategy, dict(fast_period=20, slow_period=30, printlog=False)),
+        ('bad', MovingAverageCrossStrategy, dict(fast=5)),
+    ]
+    performance_df = backtest_utils.compare_strategies(strategy_configs, data_feed, processes=2, timeout=120)
+    assert np.isclose(performance_df.loc['MA legacy', 'final_value'], performance_df.loc['MA vectorized', 'final_value'])
+    assert not np.isnan(performance_df.loc['MA legacy 2', 'final_value'])
+    assert np.isnan(performance_df.loc['bad', 'final_value'])
+    print("  ✓ 进程池策略比较通过")
+    
+    # 超时后终止仍在运行的子进程，总耗时不超过超时时间太多
+    start = time.perf_counter()
+    performance_df = backtest_utils.compare_strategies(
+        [('slow 1', _SlowStrategy, {}), ('slow 2', _SlowStrategy, {})], data_feed, processes=2, timeout=1
+    )
+    assert time.perf_counter() - start < 30
+    assert performance_df['final_value'].isna().all()
+    print("  ✓ 进程池超时通过")
+    
     print("回测工具测试通过")
 
 
+def test_vectorized_backtest():
+    """测试向量化回测与Backtrader结果一致"""
+    print("\n=== 测试向量化回测 ===")
+    
+    stock_data = _make_mock_data()
+    
+    strategy_configs = [
+        ('MA Cross', MovingAverageCrossStrategy, dict(fast_period=10, slow_period=20)),
+        ('RSI', RSIStrategy, dict(rsi_period=14, rsi_low=30, rsi_high=70)),
+        ('Bollinger Bands', BollingerBandsStrategy, dict(period=20, devfactor=2.0)),
+        ('MACD', MACDStrategy, dict(fastperiod=12, slowperiod=26, signalperiod=9)),
+        ('Buy & Hold', BuyHoldStrategy, dict()),
+    ]
+    
+    for name, strategy_class, params in strategy_configs:
+        cerebro = bt.Cerebro()
+        cerebro.adddata(bt.feeds.PandasData(dataname=stock_data))
+        cerebro.addstrategy(strategy_class, printlog=False, **params)
+        cerebro.broker.setcash(100000.0)
+        cerebro.broker.setcommission(commission=0.001)
+        cerebro.run()
+        expected = cerebro.broker.getvalue()
+        
+        result = strategy_class.run_vectorized(stock_data, cash=100000.0, commission=0.001, **params)
+        assert len(result['equity']) == len(stock_data)
+        assert abs(result['final_value'] - expected) < 1e-6, (name, result['final_value'], expected)
+        
+        # 数据未预加载时策略改用Backtrader原生指标逐bar计算，结果一致
+        cerebro = bt.Cerebro(preload=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=stock_data))
+        cerebro.addstrategy(strategy_class, printlog=False, **params)
+        cerebro.broker.setcash(100000.0)
+        cerebro.broker.setcommission(commission=0.001)
+        cerebro.run()
+        assert abs(cerebro.broker.getvalue() - expected) < 1e-6, (name, cerebro.broker.getvalue(), expected)
+        print(f"  ✓ {name}: 期末资金 {result['final_value']:.2f}")
+    
+    # 两条均线相等的平台期不打断交叉方向，与bt.indicators.CrossOver一致：均线相交后回到原方向不算交叉
+    close = np.r_[np.arange(1, 31), np.full(20, 30), np.arange(31, 61)].astype(np.float64)
+    flat_data = pd.DataFrame(
+        {'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1000},
+        index=pd.date_range('2022-01-01', periods=len(close))
+    )
+    params = dict(fast_period=5, slow_period=10)
+    for preload in (True, False):
+        cerebro = bt.Cerebro(preload=preload)
+        cerebro.adddata(bt.feeds.PandasData(dataname=flat_data))
+        cerebro.addstrategy(MovingAverageCrossStrategy, printlog=False, **params)
+        cerebro.broker.setcash(100000.0)
+        cerebro.broker.setcommission(commission=0.001)
+        cerebro.run()
+        result = MovingAverageCrossStrategy.run_vectorized(flat_data, cash=100000.0, commission=0.001, **params)
+        assert abs(result['final_value'] - cerebro.broker.getvalue()) < 1e-6, (preload, result['final_value'])
+    print("  ✓ 均线平台期的交叉信号一致")
+    
+    # 向量化指标与Backtrader回测的期末资金一致
+    data_feed = _DATA_LOADER.create_bt_data_feed(stock_data)
+    backtest_utils = BacktestUtils(initial_cash=100000.0, commission=0.001)
+    for name, strategy_class, params in strategy_configs:
+        metrics = backtest_utils.run_strategy_and_get_metrics(strategy_class, data_feed, **params)
+        legacy = backtest_utils.run_strategy_and_get_metrics(
+            strategy_class, data_feed, use_legacy=True, printlog=False, **params
+        )
+        assert abs(metrics['final_value'] - legacy['final_value']) < 1e-6
+        assert len(metrics['equity_curve']) == len(legacy['equity_curve'])
+    
+    # float32价格数组的结果与float64在1e-5的相对误差内一致
+    float32_utils = BacktestUtils(initial_cash=100000.0, commission=0.001, price_dtype=np.float32)
+    for name, strategy_class, params in strategy_configs:
+        metrics = float32_utils.run_strategy_and_get_metrics(strategy_class, data_feed, **params)
+        expected = backtest_utils.run_strategy_and_get_metrics(strategy_class, data_feed, **params)
+        assert np.isclose(metrics['final_value'], expected['final_value'], rtol=1e-5), name
+    print("  ✓ float32价格数组结果一致")
+    
+    # 批量内核释放GIL，多个线程同时调用的结果与串行调用一致
+    from concurrent.futures import ThreadPoolExecutor
+    param_list = [dict(fast_period=fast, slow_period=slow) for fast in (5, 10, 15) for slow in (20, 30, 40)]
+    serial = MovingAverageCrossStrategy.run_vectorized_batch(stock_data, param_list)['final_value']
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        threaded = list(executor.map(
+            lambda _: MovingAverageCrossStrategy.run_vectorized_batch(stock_data, param_list)['final_value'], range(8)
+        ))
+    assert all(np.array_equal(values, serial) for values in threaded)
+    print("  ✓ 多线程批量回测结果一致")
+    
+    print("向量化回测测试通过")
+
+
+def test_other_data_feeds():
+    """测试CSV数据源和自定义列映射的Pandas数据源退回Backtrader回测"""
+    print("\n=== 测试其他数据源 ===")
+    
+    import tempfile
+    
+    stock_data = _make_mock_data()
+    csv_file = os.path.join(tempfile.mkdtemp(), 'mock.csv')
+    stock_data.rename_axis('Date').to_csv(csv_file)
+    renamed = stock_data.rename(columns=str.lower).rename(columns={'close': 'adj_close', 'open': 'close'})
+    
+    feeds = [
+        ('CSV', bt.feeds.GenericCSVData(
+            dataname=csv_file, dtformat='%Y-%m-%d', datetime=0, open=1, high=2, low=3, close=4, volume=5,
+            openinterest=-1
+        )),
+        ('自定义列映射', bt.feeds.PandasData(dataname=renamed, open='close', close='adj_close')),
+    ]
+    params = dict(fast_period=10, slow_period=20)
+    backtest_utils = BacktestUtils(initial_cash=100000.0, commission=0.001)
+    expected = backtest_utils.run_strategy_and_get_metrics(
+        MovingAverageCrossStrategy, _DATA_LOADER.create_bt_data_feed(stock_data), **params
+    )['final_value']
+    
+    for name, data_feed in feeds:
+        # 单个策略、策略比较和参数优化都与DataFrame数据源的结果一致
+        metrics = backtest_utils.run_strategy_and_get_metrics(
+            MovingAverageCrossStrategy, data_feed, printlog=False, **params
+        )
+        assert np.isclose(metrics['final_value'], expected), (name, metrics['final_value'], expected)
+        
+        performance_df = backtest_utils.compare_strategies(
+            [('MA Cross', MovingAverageCrossStrategy, dict(printlog=False, **params))], data_feed
+        )
+        assert np.isclose(performance_df.loc['MA Cross', 'final_value'], expected), name
+        
+        optimization_df = backtest_utils.optimize_parameters(
+            MovingAverageCrossStrategy, data_feed, {'fast_period': [10], 'slow_period': [20], 'printlog': [False]},
+            processes=1
+        )
+        assert np.isclose(optimization_df['final_value'].iloc[0], expected), name
+        print(f"  ✓ {name}数据源结果一致")
+
+
+def test_optional_backends():
+    """测试可选依赖(polars、pyarrow)对应的实现与默认实现一致"""
+    print("\n=== 测试可选依赖 ===")
+    
+    import tempfile
+    from strategy import data_loader, indicators, indicators_pl
+    
+    stock_data = _make_mock_data()
+    close = stock_data['Close'].to_numpy()
+    # 包含快线周期大于慢线周期的MACD，信号线的起点取两者中的较大值
+    keys = [('sma', 20), ('bbands', 20, 2.0), ('macd', 12, 26, 9), ('macd', 26, 12, 9), ('rsi', 14)]
+    
+    # Polars批量计算的指标与逐个计算的结果一致(未安装polars时两者都使用pandas)
+    batched = indicators_pl.compute_indicators(stock_data, keys)
+    expected = {
+        ('sma', 20): indicators.sma_fast(close, 20),
+        ('bbands', 20, 2.0): indicators.bbands_fast(close, 20, 2.0),
+        ('macd', 12, 26, 9): indicators.macd_fast(close, 12, 26, 9),
+        ('macd', 26, 12, 9): indicators.macd_fast(close, 26, 12, 9),
+        ('rsi', 14): indicators.rsi_sma_fast(close, 14),
+    }
+    for key in keys:
+        assert np.allclose(batched[key], expected[key], equal_nan=True), key
+    print(f"  ✓ 批量指标计算一致 (polars: {'已安装' if indicators_pl.pl is not None else '未安装'})")
+    
+    if data_loader.pyarrow is None:
+        print("  - 未安装pyarrow，跳过Parquet缓存测试")
+        return
+    
+    # Parquet缓存读写一致，调用方的原地修改不影响之后的加载
+    loader = DataLoader(cache_dir=tempfile.mkdtemp())
+    cache_name = loader._cache_name('TEST', '2022-01-01', '2022-12-31')
+    loader._write_cache(stock_data, 'TEST', cache_name)
+    loaded = loader._load_cached('TEST', '2022-01-01', '2022-12-31')
+    pd.testing.assert_frame_equal(loaded, stock_data, check_freq=False, check_names=False)
+    loaded['Close'] *= 2
+    reloaded = loader._load_cached('TEST', '2022-01-01', '2022-12-31')
+    pd.testing.assert_frame_equal(reloaded, stock_data, check_freq=False, check_names=False)
+    print("  ✓ Parquet缓存读写一致")
+
+
 def test_imports():
     """测试导入功能"""
     print("\n=== 测试导入功能 ===")
@@ -180,6 +460,9 @@ def main():
     test_data_loader()
     test_strategies()
     test_backtest_utils()
+    test_vectorized_backtest()
+    test_other_data_feeds()
+    test_optional_backends()
     
     print("\n=== 所有测试完成 ===")
     print("✓ 策略拆分验证成功！")
@@ -0,0 +1,300 @@
+"""
+向量化回测引擎
+
+用一次NumPy遍历替代Backtrader逐bar的事件循环，包括：
+- OHLCV数据转换为连续数组
+- 交叉信号计算
+- 轻量级成交模拟
+- 性能指标计算
+- 多组信号的批量回测
+"""
+
+import math
+
+import numpy as np
+
+from quantics.strategy._njit import hotpath, jit_signatures, njit
+
+
+def to_arrays(stock_data, dtype=np.float64):
+    """
+    将OHLCV数据转换为独立的连续数组(按列存储)
+
+    参数：
+    - stock_data: pandas DataFrame格式的股票数据，列名大小写均可
+    - dtype: 数组精度，默认np.float64；np.float32可使数组内存减半，
+      回测结果与float64在1e-5的相对误差内一致
+
+    返回：
+    - dict: {'open': ..., 'high': ..., 'low': ..., 'close': ..., 'volume': ...}
+    """
+    columns = {str(col).lower(): col for col in stock_data.columns}
+    arrays = {}
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        if name in columns:
+            arrays[name] = stock_data[columns[name]].to_numpy(dtype=dtype, copy=True)
+    return arrays
+
+
+def cross_signals(fast, slow):
+    """
+    计算两条曲线的交叉信号
+
+    与bt.indicators.CrossOver一致：两线相等的bar不打断原有的方向，当前差值与此前最后一个非零差值
+    符号相反时才记为交叉，两线相交后又回到原方向不算交叉
+
+    参数：
+    - fast: 快线数组
+    - slow: 慢线数组
+
+    返回：
+    - numpy.ndarray: int8信号数组，1为上穿，-1为下穿，0为无交叉
+    """
+    diff = np.asarray(fast, dtype=np.float64) - slow
+    valid = ~np.isnan(diff)
+    # 预热期(NaN)的符号记为0，前一个bar无效时不产生交叉
+    sign = np.sign(np.where(valid, diff, 0.0)).astype(np.int8)
+    # 向前填充符号为0的bar，得到截至每个bar最后一个非零差值的符号(同NonZeroDifference)
+    last = np.where(sign != 0, np.arange(len(sign)), 0)
+    np.maximum.accumulate(last, out=last)
+    last_sign = sign[last]
+    signals = np.zeros(len(sign), dtype=np.int8)
+    signals[1:] = sign[1:] * ((sign[1:] == -last_sign[:-1]) & valid[:-1])
+    return signals
+
+
+def level_signals(buy_mask, sell_mask):
+    """
+    将买入/卖出条件合并为信号数组
+
+    参数：
+    - buy_mask: 买入条件布尔数组
+    - sell_mask: 卖出条件布尔数组
+
+    返回：
+    - numpy.ndarray: int8信号数组，1为买入，-1为卖出，0为无信号
+    """
+    signals = np.zeros(len(buy_mask), dtype=np.int8)
+    signals[buy_mask] = 1
+    signals[sell_mask] = -1
+    return signals
+
+
+# 显式签名使函数在导入时即完成编译，cache=True将编译结果缓存到磁盘，避免每次运行的JIT预热
+# 价格支持float64和float32两种精度，资金始终按float64累计，避免误差逐笔放大
+# nogil=True使内核运行时释放GIL，多个线程中的回测可以并行执行
+@njit(jit_signatures([
+    'Tuple((f8[:], i8[:, :]))(f8[:], f8[:], i1[:], f8, f8, f8)',
+    'Tuple((f8[:], i8[:, :]))(f4[:], f4[:], i1[:], f8, f8, f8)',
+]), cache=True, nogil=True)
+def _simulate(close, fill, signals, cash, commission, cash_ratio):
+    """
+    成交模拟
+
+    与Backtrader的市价单规则一致：第i个bar收盘时产生的信号在第i+1个bar以fill价格成交，
+    资金不足时订单被拒绝。无持仓时只响应买入信号，有持仓时只响应卖出信号。
+
+    返回：
+    - tuple: (equity, trades)，trades每行为(成交bar索引, 成交股数)，卖出股数为负
+    """
+    n = len(close)
+    equity = np.empty(n)
+    trades = np.empty((n, 2), dtype=np.int64)
+    n_trades = 0
+    position = 0
+    pending = 0
+
+    for i in range(n):
+        # 执行上一个bar提交的订单
+        if pending != 0:
+            value = pending * fill[i]
+            fee = abs(value) * commission
+            if pending < 0 or value + fee <= cash:
+                cash -= value + fee
+                position += pending
+                trades[n_trades, 0] = i
+                trades[n_trades, 1] = pending
+                n_trades += 1
+            pending = 0
+
+        # 根据当前bar的信号提交订单
+        if position == 0 and signals[i] > 0:
+            size = int(cash * cash_ratio // close[i])
+            if size > 0:
+                pending = size
+        elif position > 0 and signals[i] < 0:
+            pending = -position
+
+        equity[i] = cash + position * close[i]
+
+    return equity, trades[:n_trades]
+
+
+# 一次遍历资金曲线同时计算收益率均值/方差(Welford算法)、最大回撤和年化收益率
+@njit(jit_signatures('UniTuple(f8, 4)(f8[:], i8[:, :], f8)'), cache=True, nogil=True)
+def _metrics(equity, trades, initial_cash):
+    """
+    性能指标计算
+
+    参数：
+    - equity: 每个bar的资金数组
+    - trades: _simulate返回的成交记录，为空时不计算胜率
+    - initial_cash: 初始资金，作为资金曲线的起点
+
+    返回：
+    - tuple: (夏普比率, 最大回撤(%), 年化收益率(%), 胜率(%))，无法计算时为NaN
+    """
+    n = len(equity)
+    if n == 0:
+        return np.nan, np.nan, np.nan, np.nan
+
+    prev = initial_cash
+    peak = initial_cash
+    mean = 0.0
+    m2 = 0.0
+    max_drawdown = 0.0
+    for i in range(n):
+        value = equity[i]
+        ret = value / prev - 1.0
+        delta = ret - mean
+        mean += delta / (i + 1)
+        m2 += delta * (ret - mean)
+        if value > peak:
+            peak = value
+        drawdown = (peak - value) / peak
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+        prev = value
+
+    # 夏普比率按日收益率年化
+    std = math.sqrt(m2 / n)
+    sharpe = mean / std * math.sqrt(252.0) if std > 0 else np.nan
+    annual_return = ((equity[n - 1] / initial_cash) ** (252.0 / n) - 1.0) * 100.0
+
+    # 全仓策略每笔交易的净盈亏 = 平仓后资金 - 开仓前资金
+    won = 0
+    closed = 0
+    for j in range(1, len(trades)):
+        if trades[j - 1, 1] > 0 and trades[j, 1] < 0:
+            entry = trades[j - 1, 0]
+            before = equity[entry - 1] if entry > 0 else initial_cash
+            closed += 1
+            if equity[trades[j, 0]] > before:
+                won += 1
+    win_rate = won / closed * 100.0 if closed > 0 else np.nan
+
+    return sharpe, max_drawdown * 100.0, annual_return, win_rate
+
+
+# 一次内核调用依次完成各组的成交模拟和指标计算，省去逐组调用的Python开销
+# 不使用parallel=True：numba的TBB/OpenMP线程池启动后fork出的进程池会使父进程在退出时挂起，
+# workqueue线程池又不支持多个线程同时调用；内核释放GIL，需要并行时由调用方在多个线程中分批调用
+@njit(jit_signatures([
+    'Tuple((f8[:, :], f8[:, :]))(f8[:], f8[:], i1[:, :], f8, f8, f8)',
+    'Tuple((f8[:, :], f8[:, :]))(f4[:], f4[:], i1[:, :], f8, f8, f8)',
+]), cache=True, nogil=True)
+def _simulate_batch(close, fill, signals, cash, commission, cash_ratio):
+    """
+    批量成交模拟
+
+    参数：
+    - signals: (k, n)信号数组，每行为一组参数的信号
+
+    返回：
+    - tuple: (equity, metrics)，equity为(k, n)资金曲线，
+      metrics每行为(夏普比率, 最大回撤(%), 年化收益率(%), 胜率(%))
+    """
+    k = signals.shape[0]
+    equity = np.empty((k, len(close)))
+    metrics = np.empty((k, 4))
+    for j in range(k):
+        row, trades = _simulate(close, fill, signals[j], cash, commission, cash_ratio)
+        equity[j] = row
+        sharpe, max_drawdown, annual_return, win_rate = _metrics(row, trades, cash)
+        metrics[j, 0] = sharpe
+        metrics[j, 1] = max_drawdown
+        metrics[j, 2] = annual_return
+        metrics[j, 3] = win_rate
+    return equity, metrics
+
+
+# 存在AOT预编译的内核时优先使用，参数和返回值与JIT版本相同
+if hotpath is not None:
+    _simulate_kernels = {np.float64: hotpath.simulate_f8, np.float32: hotpath.simulate_f4}
+    compute_metrics = hotpath.metrics
+else:
+    _simulate_kernels = {np.float64: _simulate, np.float32: _simulate}
+    compute_metrics = _metrics
+
+
+def run_vectorized(close, signals, cash=100000.0, commission=0.001, open_prices=None, cash_ratio=0.99):
+    """
+    根据信号数组运行向量化回测
+
+    参数：
+    - close: 收盘价数组，float32数组保持原精度，其余转换为float64
+    - signals: int8信号数组，1为买入，-1为卖出
+    - cash: 初始资金，默认100000.0
+    - commission: 佣金率，默认0.001 (0.1%)
+    - open_prices: 开盘价数组，订单以下一个bar的开盘价成交；为None时使用收盘价
+    - cash_ratio: 买入时使用的资金比例，默认0.99
+
+    返回：
+    - dict: 包含资金曲线、成交记录和期末资金
+    """
+    # 编译签名要求可写数组，只读输入(如pandas的写时复制视图)需要复制一次
+    dtype = np.float32 if np.asarray(close).dtype == np.float32 else np.float64
+    close = np.require(close, dtype, ['W'])
+    fill = close if open_prices is None else np.require(open_prices, dtype, ['W'])
+    signals = np.require(signals, np.int8, ['W'])
+
+    equity, trades = _simulate_kernels[dtype](
+        close, fill, signals, float(cash), float(commission), float(cash_ratio)
+    )
+    final_value = equity[-1] if len(equity) else float(cash)
+
+    return {
+        'equity': equity,
+        'trades': trades,
+        'final_value': final_value,
+        'total_return': (final_value / cash - 1) * 100,
+    }
+
+
+def run_vectorized_batch(close, signals, cash=100000.0, commission=0.001, open_prices=None, cash_ratio=0.99):
+    """
+    对多组信号批量运行向量化回测
+
+    所有参数组合共享同一份价格数组，在一次内核调用中完成全部组合的成交模拟和指标计算。
+    内核运行时释放GIL，可以在多个线程中同时调用
+
+    参数：
+    - close: 收盘价数组，float32数组保持原精度，其余转换为float64
+    - signals: (k, n)的int8信号数组，每行为一组参数的信号
+    - cash: 初始资金，默认100000.0
+    - commission: 佣金率，默认0.001 (0.1%)
+    - open_prices: 开盘价数组，订单以下一个bar的开盘价成交；为None时使用收盘价
+    - cash_ratio: 买入时使用的资金比例，默认0.99
+
+    返回：
+    - dict: 包含(k, n)资金曲线，以及长度为k的期末资金、总收益率和各项性能指标，无法计算的指标为NaN
+    """
+    dtype = np.float32 if np.asarray(close).dtype == np.float32 else np.float64
+    close = np.require(close, dtype, ['W'])
+    fill = close if open_prices is None else np.require(open_prices, dtype, ['W'])
+    signals = np.require(signals, np.int8, ['C', 'W']).reshape(-1, len(close))
+
+    equity, metrics = _simulate_batch(
+        close, fill, signals, float(cash), float(commission), float(cash_ratio)
+    )
+    final_value = equity[:, -1] if len(close) else np.full(len(signals), float(cash))
+
+    return {
+        'equity': equity,
+        'final_value': final_value,
+        'total_return': (final_value / cash - 1) * 100,
+        'sharpe_ratio': metrics[:, 0],
+        'max_drawdown': metrics[:, 1],
+        'annual_return': metrics[:, 2],
+        'win_rate': metrics[:, 3],
+    }